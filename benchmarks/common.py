@@ -0,0 +1,30 @@
+"""Shared helpers for the benchmark scripts"""
+import importlib.util
+import os
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOL_PATH = os.path.join(REPO_DIR, "tts-helper-tool.py")
+
+def load_tool():
+    """Import tts-helper-tool.py as a module (its file name is not a valid module name)"""
+    spec = importlib.util.spec_from_file_location("tts_helper_tool", TOOL_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def best_time(function, *args, repeat: int = 3) -> float:
+    """Best wall clock time in seconds of several calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def sample_text(size: int, non_ascii: bool = True) -> str:
+    """Build roughly size characters of prose with quotes, ampersands and, optionally, non-ASCII characters"""
+    sentence = "It's a \"quick\" test of R&D output, with  double spaces. Is it fast? Yes!\n"
+    if non_ascii:
+        sentence += "Café “naïve” résumé — it’s done… "
+    return (sentence * (size // len(sentence) + 1))[:size]
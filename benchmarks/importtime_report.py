@@ -0,0 +1,62 @@
+"""
+Import time report for tts-helper-tool.py, based on `python -X importtime`.
+
+Runs the tool with --help in a fresh interpreter, so only the imports needed at startup are
+counted, and lists the slowest top-level imports. Results can be saved as JSON and compared with
+an earlier run to spot startup regressions.
+
+Usage: python benchmarks/importtime_report.py [--top N] [--save report.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from common import TOOL_PATH
+
+def measure_imports(runs: int):
+    """Return {module: cumulative microseconds} for top-level imports, the best of several runs"""
+    best = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", TOOL_PATH, "--help"],
+                                capture_output=True, text=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if name.startswith("  "):
+                continue  # Nested import, already counted in its parent
+            name = name.strip()
+            best[name] = min(best.get(name, float("inf")), int(cumulative))
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time report for tts-helper-tool.py")
+    parser.add_argument("--top", type=int, default=15, help="Number of imports to list (default: 15)")
+    parser.add_argument("--runs", type=int, default=5, help="Runs to take the best time from (default: 5)")
+    parser.add_argument("--save", help="Save the report as JSON to this path")
+    parser.add_argument("--compare", help="Compare against a report saved earlier with --save")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.runs)
+    total = sum(imports.values())
+    print(f"Top-level imports at startup: {len(imports)}, total {total / 1000:.1f} ms")
+    for name, cumulative in sorted(imports.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        baseline_total = sum(baseline["imports"].values())
+        print(f"\nCompared to '{args.compare}': {(total - baseline_total) / 1000:+.1f} ms")
+        added = sorted(set(imports) - set(baseline["imports"]))
+        if added:
+            print(f"  New top-level imports: {', '.join(added)}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"python": sys.version, "imports": imports}, fh, indent=2)
+        print(f"\nSaved report to '{args.save}'")
+
+if __name__ == "__main__":
+    main()
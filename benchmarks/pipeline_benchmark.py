@@ -0,0 +1,258 @@
+"""
+End-to-end pipeline benchmark: the real producer and audio player, against the local stub server
+and with a null audio sink instead of the sound device.
+
+Every combination of input size, concurrency and cache state runs in a fresh process, so its
+peak RSS is its own. A run reports its throughput in text characters and in seconds of audio
+per second, the time to first audio, and the p50/p95/p99 latency of each pipeline stage:
+sanitize, split (per chunk), request, decode and play-enqueue (handing a chunk to the player).
+A warm cache run is preceded by an unmeasured run that fills the cache. Audio is decoded with
+ffmpeg like in the tool; without ffmpeg the decode stage is skipped.
+
+Results can be saved as JSON and compared with an earlier run to spot regressions.
+
+Usage: python benchmarks/pipeline_benchmark.py [--sizes 2000,20000] [--concurrency 1,3,8] [--cache none,cold,warm]
+           [--engine threaded|async] [--latency SECONDS] [--jitter SECONDS] [--save results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from common import load_tool
+from stub_server import StubServer, SyntheticSpeech
+
+STAGES = ["sanitize", "split", "request", "decode", "enqueue"]
+CACHE_STATES = ["none", "cold", "warm"]
+VOICE_ID = "voice-107"
+
+def pipeline_text(size: int) -> str:
+    """About size characters of distinct sentences with quotes, ampersands and non-ASCII characters to sanitize"""
+    sentences = []
+    length = 0
+    while length < size:
+        sentence = f"Sentence {len(sentences)} is a \"quick\" test of R&D output, with  double spaces — it's café time… "
+        sentences.append(sentence)
+        length += len(sentence)
+    return "".join(sentences)[:size]
+
+def timed(stages: dict, name: str, function):
+    """Wrap a function so that the duration of every call is added to stages[name]"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stages[name].append(time.perf_counter() - start)
+    return wrapper
+
+def timed_async(stages: dict, name: str, function):
+    """timed() for coroutine functions"""
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            stages[name].append(time.perf_counter() - start)
+    return wrapper
+
+def instrument(tool, stages: dict) -> None:
+    """Time the pipeline stages of the loaded tool module"""
+    tool.sanitize_text = timed(stages, "sanitize", tool.sanitize_text)
+    split = tool.iter_text_chunks
+
+    def timed_split(text, next_chunk_size):
+        chunks = split(text, next_chunk_size)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            stages["split"].append(time.perf_counter() - start)
+            yield chunk
+
+    tool.iter_text_chunks = timed_split
+    tool.TtsProducer.get_audio = timed(stages, "request", tool.TtsProducer.get_audio)
+    tool.AsyncTtsProducer.get_audio = timed_async(stages, "request", tool.AsyncTtsProducer.get_audio)
+    tool.AudioPlayer.decode_audio = timed(stages, "decode", tool.AudioPlayer.decode_audio)
+    tool.AudioPlayer.put = timed(stages, "enqueue", tool.AudioPlayer.put)
+
+def null_player(tool, decode: bool):
+    """AudioPlayer that decodes its audio like the real one, but writes it nowhere and doesn't wait for it to play"""
+    class NullAudioPlayer(tool.AudioPlayer):
+        audio_seconds = 0.0
+
+        def put(self, mp3_byte_data, started_at=None):
+            self.audio_seconds += tool.mp3_duration(mp3_byte_data)
+            super().put(mp3_byte_data, started_at)
+
+        def decode_audio(self, mp3_data):
+            if decode:
+                return super().decode_audio(mp3_data)
+            return b"", 1, 24000, 2
+
+        def write_pcm(self, pcm, channels, frame_rate, sample_width, epoch=None):
+            return True
+
+        def record_first_sound(self, started_at):
+            self.first_sound_latencies.append(time.monotonic() - started_at)
+
+    return NullAudioPlayer()
+
+def peak_rss_mb() -> float | None:
+    """Peak resident memory of this process in MB, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_pipeline(config: dict, url: str, cache_dir: str | None, results) -> None:
+    """Worker process: speak one text through the instrumented pipeline and put the measurements in `results`"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tool = load_tool()
+        stages = defaultdict(list)
+        instrument(tool, stages)
+        text = pipeline_text(config["size"])
+        cache = tool.AudioCache(cache_dir, 1 << 30) if cache_dir is not None else None
+        player = null_player(tool, config["decode"])
+        producer_class = tool.AsyncTtsProducer if config["engine"] == "async" else tool.TtsProducer
+        producer = producer_class(VOICE_ID, player, concurrency=config["concurrency"], cache=cache,
+                                  backend=tool.StubBackend(url))
+        start = time.perf_counter()
+        producer.put(text)
+        producer.wait_for_completion()
+        player.wait_for_completion()
+        elapsed = time.perf_counter() - start
+        if cache is not None:
+            cache.save_index()
+
+    summary = {}
+    for stage in STAGES:
+        ordered = sorted(stages[stage])
+        if ordered:
+            summary[stage] = {"count": len(ordered), **{f"p{p}": tool.percentile(ordered, p / 100) * 1000 for p in (50, 95, 99)}}
+    results.put({
+        **config,
+        "elapsed": elapsed,
+        "chars_per_second": len(text) / elapsed,
+        "audio_per_second": player.audio_seconds / elapsed,
+        "first_audio_ms": player.first_sound_latencies[0] * 1000 if player.first_sound_latencies else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": summary,
+    })
+
+def measure(context, config: dict, url: str, cache_dir: str | None) -> dict:
+    """Run one configuration in a fresh process"""
+    results = context.Queue()
+    worker = context.Process(target=run_pipeline, args=(config, url, cache_dir, results))
+    worker.start()
+    while True:
+        try:
+            result = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not worker.is_alive():
+                raise RuntimeError(f"The run of {describe(config)} failed, see its error above")
+    worker.join()
+    return result
+
+def run_key(result: dict) -> tuple:
+    return result["engine"], result["size"], result["concurrency"], result["cache"]
+
+def describe(result: dict) -> str:
+    cache = "no cache" if result["cache"] == "none" else f"{result['cache']} cache"
+    return f"{result['size']} chars, concurrency {result['concurrency']}, {cache}"
+
+def print_result(result: dict) -> None:
+    first_audio = f"{result['first_audio_ms']:.0f} ms" if result["first_audio_ms"] is not None else "n/a"
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+    print(f"  {describe(result)}: {result['chars_per_second']:,.0f} chars/s, {result['audio_per_second']:.0f}x real time, "
+          f"first audio {first_audio}, peak RSS {rss}")
+    for stage in STAGES:
+        latencies = result["stages"].get(stage)
+        if latencies:
+            print(f"      {stage:<9} p50/p95/p99 {latencies['p50']:8.2f} {latencies['p95']:8.2f} {latencies['p99']:8.2f} ms"
+                  f"  ({latencies['count']} calls)")
+
+def change(value, baseline) -> str:
+    if value is None or not baseline:
+        return "n/a"
+    return f"{(value - baseline) / baseline * 100:+.0f}%"
+
+def compare(results: list, baseline_path: str) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as fh:
+        baseline = {run_key(result): result for result in json.load(fh)["results"]}
+    print(f"\nCompared to '{baseline_path}':")
+    for result in results:
+        before = baseline.get(run_key(result))
+        if before is None:
+            print(f"  {describe(result)}: not in the baseline")
+            continue
+        request_p95 = result["stages"].get("request", {}).get("p95")
+        request_p95_before = before["stages"].get("request", {}).get("p95")
+        print(f"  {describe(result)}: throughput {change(result['chars_per_second'], before['chars_per_second'])}, "
+              f"first audio {change(result['first_audio_ms'], before['first_audio_ms'])}, "
+              f"request p95 {change(request_p95, request_p95_before)}, "
+              f"peak RSS {change(result['peak_rss_mb'], before['peak_rss_mb'])}")
+
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int_list, default=[2000, 20000], help="Input sizes in characters (default: 2000,20000)")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 3, 8], help="Concurrency levels (default: 1,3,8)")
+    parser.add_argument("--cache", default=",".join(CACHE_STATES), help="Audio cache states: none, cold, warm (default: all)")
+    parser.add_argument("--engine", choices=["threaded", "async"], default="threaded")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the stub server takes per request (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Average extra seconds, exponentially distributed (default: 0.02)")
+    parser.add_argument("--save", help="Save the results as JSON to this path")
+    parser.add_argument("--compare", help="Compare against results saved earlier with --save")
+    args = parser.parse_args()
+    requested_states = set(args.cache.split(","))
+    if not requested_states <= set(CACHE_STATES):
+        parser.error(f"--cache takes a comma separated list of {', '.join(CACHE_STATES)}")
+    cache_states = [state for state in CACHE_STATES if state in requested_states]  # A cold run fills the cache of the warm one
+
+    decode = shutil.which("ffmpeg") is not None
+    print(f"{args.engine} engine, stub latency {args.latency * 1000:.0f} ms + {args.jitter * 1000:.0f} ms jitter, "
+          f"{'decoding with ffmpeg' if decode else 'ffmpeg not found, decode skipped'}")
+    # A fresh interpreter per run, so that peak RSS is not inherited from this process
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with StubServer(SyntheticSpeech(args.latency, args.jitter, seed=1)) as server:
+        for size in args.sizes:
+            for concurrency in args.concurrency:
+                with tempfile.TemporaryDirectory() as cache_dir:
+                    for cache in cache_states:
+                        config = {"engine": args.engine, "size": size, "concurrency": concurrency, "cache": cache, "decode": decode}
+                        if cache == "warm" and "cold" not in cache_states:
+                            measure(context, {**config, "cache": "cold"}, server.url, cache_dir)
+                        result = measure(context, config, server.url, cache_dir if cache != "none" else None)
+                        print_result(result)
+                        results.append(result)
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"python": sys.version, "platform": platform.platform(),
+                       "stub": {"latency": args.latency, "jitter": args.jitter}, "results": results}, fh, indent=2)
+        print(f"\nSaved results to '{args.save}'")
+
+if __name__ == "__main__":
+    main()
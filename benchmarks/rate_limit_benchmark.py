@@ -0,0 +1,129 @@
+"""
+Client-side rate limiting against a local stub server that throttles above SERVER_LIMIT requests
+per second: chunks lost to throttling with and without a shared RateLimiter, how long an
+interactive text waits behind a bulk render, and the combined request rate of two processes
+sharing a limiter through a state file.
+
+Usage: python benchmarks/rate_limit_benchmark.py
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+from common import load_tool
+from retry_benchmark import CONCURRENCY, CountingConsumer, chunked_text
+from stub_server import StubResponse, StubServer
+
+SERVER_LIMIT = 10  # requests per second
+CHUNKS = 30  # per producer
+PROCESS_REQUESTS = 40  # per process
+
+class ThrottlingServer:
+    """Stub behaviour of a server that answers 429 beyond SERVER_LIMIT requests in the last second"""
+    def __init__(self):
+        self.recent = deque()
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, attempt):
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] >= 1:
+                self.recent.popleft()
+            if len(self.recent) >= SERVER_LIMIT:
+                self.throttled += 1
+                return StubResponse(status=429, content_type="text/plain", body=b"Too many requests", headers={"Retry-After": "1"})
+            self.recent.append(now)
+        return StubResponse(delay=0.05)
+
+class TimingConsumer(CountingConsumer):
+    """Remembers when the first audio arrived"""
+    def __init__(self):
+        super().__init__()
+        self.first_at = None
+
+    def put(self, mp3_data, started_at=None):
+        if self.first_at is None:
+            self.first_at = time.perf_counter()
+        super().put(mp3_data, started_at)
+
+def make_producer(tool, server, consumer, rate_limiter, priority):
+    return tool.TtsProducer("voice-1", consumer, concurrency=CONCURRENCY, rate_limiter=rate_limiter, priority=priority,
+                            backend=tool.StubBackend(server.url))
+
+def shared_producers(tool, limited: bool):
+    """Two producers rendering at once, with or without a shared limiter just below the server's limit"""
+    behaviour = ThrottlingServer()
+    rate_limiter = tool.RateLimiter(SERVER_LIMIT * 60 * 0.9, burst=1) if limited else None
+    consumers = [CountingConsumer(), CountingConsumer()]
+    with StubServer(behaviour) as server, contextlib.redirect_stdout(io.StringIO()):
+        producers = [make_producer(tool, server, consumer, rate_limiter, tool.RateLimiter.PRIORITY_BULK) for consumer in consumers]
+        start = time.perf_counter()
+        for i, producer in enumerate(producers):
+            producer.put(chunked_text(tool, CHUNKS, f"producer {i}"))
+        for producer in producers:
+            producer.wait_for_completion()
+        elapsed = time.perf_counter() - start
+    return sum(consumer.chunks for consumer in consumers), behaviour.throttled, elapsed
+
+def interactive_wait(tool, priority):
+    """Seconds until the first audio of a short text put while a bulk render saturates the limiter"""
+    rate_limiter = tool.RateLimiter(SERVER_LIMIT * 60 * 0.9, burst=1)
+    bulk_consumer, interactive_consumer = CountingConsumer(), TimingConsumer()
+    with StubServer(ThrottlingServer()) as server, contextlib.redirect_stdout(io.StringIO()):
+        bulk = make_producer(tool, server, bulk_consumer, rate_limiter, tool.RateLimiter.PRIORITY_BULK)
+        interactive = make_producer(tool, server, interactive_consumer, rate_limiter, priority)
+        bulk.put(chunked_text(tool, CHUNKS, "bulk render"))
+        time.sleep(1)
+        start = time.perf_counter()
+        interactive.put("Stop the render for a moment, please.")
+        interactive.wait_for_completion()
+        waited = interactive_consumer.first_at - start
+        bulk.wait_for_completion()
+    return waited
+
+def send_through_file(state_path: str, results):
+    """Worker process: take PROCESS_REQUESTS tokens from the limiter shared through state_path"""
+    tool = load_tool()
+    rate_limiter = tool.RateLimiter(SERVER_LIMIT * 60, burst=1, state_path=state_path)
+    times = []
+    for _ in range(PROCESS_REQUESTS):
+        rate_limiter.acquire(tool.RateLimiter.PRIORITY_BULK)
+        times.append(time.time())
+    results.put(times)
+
+def shared_processes() -> float:
+    """Combined rate of two processes sharing a limiter of SERVER_LIMIT requests per second through a file"""
+    with tempfile.TemporaryDirectory() as folder:
+        state_path = os.path.join(folder, "rate_limit.json")
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=send_through_file, args=(state_path, results)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        times = sorted(results.get() + results.get())
+        for worker in workers:
+            worker.join()
+    return (len(times) - 1) / (times[-1] - times[0])
+
+def main():
+    tool = load_tool()
+    print(f"Server limit {SERVER_LIMIT} requests per second, {CONCURRENCY} requests in flight per producer")
+    print(f"  {'two producers':<32} {'chunks':>7} {'429s':>6} {'time':>7}")
+    for limited in (False, True):
+        chunks, throttled, elapsed = shared_producers(tool, limited)
+        name = "shared limiter at 90%" if limited else "no limiter"
+        print(f"  {name:<32} {chunks:>4}/{2 * CHUNKS} {throttled:>6} {elapsed:>6.2f}s")
+
+    print("  interactive text behind a bulk render")
+    for name, priority in (("same priority", tool.RateLimiter.PRIORITY_BULK), ("interactive priority", tool.RateLimiter.PRIORITY_INTERACTIVE)):
+        print(f"  {name:<32} {interactive_wait(tool, priority):>6.2f}s to first audio")
+
+    print(f"  two processes sharing a limiter file: {shared_processes():.1f} requests per second combined")
+
+if __name__ == "__main__":
+    main()
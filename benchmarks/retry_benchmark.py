@@ -0,0 +1,145 @@
+"""
+Failure scenarios against a local stub server: how many chunks the producer still delivers, how
+many requests it sends to do so and how long it takes, with the retry policy, request hedging
+and the circuit breaker. Each scenario checks the expected behaviour, and the benchmark exits
+with an error if one doesn't hold.
+
+Usage: python benchmarks/retry_benchmark.py [--engine threaded|async]
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import time
+from dataclasses import dataclass
+
+from common import load_tool
+from stub_server import StubResponse, StubServer
+
+CHUNKS = 40
+CONCURRENCY = 4
+HEDGE_SAMPLES = 10  # latencies seen before hedging starts, low enough to show on a short run
+
+class CountingConsumer:
+    """Stands in for the audio player"""
+    def __init__(self):
+        self.chunks = 0
+
+    def put(self, mp3_data, started_at=None):
+        self.chunks += 1
+
+    def wait_for_completion(self):
+        pass
+
+def flaky(attempt):
+    """Every chunk fails once with a server error"""
+    return StubResponse(status=503) if attempt == 0 else StubResponse()
+
+def rate_limited(attempt):
+    """Every chunk is throttled once and asked to come back in a second"""
+    return StubResponse(status=429, headers={"Retry-After": "1"}) if attempt == 0 else StubResponse()
+
+def wrong_content(attempt):
+    """Every chunk gets an HTML error page with a success status once"""
+    return StubResponse(content_type="text/html", body=b"<html>Try again later</html>") if attempt == 0 else StubResponse()
+
+def rejected(attempt):
+    """Every chunk is refused as a bad request, which no retry can fix"""
+    return StubResponse(status=400, content_type="application/json", body=b'{"error": "bad request"}')
+
+class SlowTail:
+    """
+    One request in ten takes 2 s instead of 50 ms, duplicates are fast. The first slow request
+    comes once the producer has seen enough latencies to hedge, whatever order requests arrive in.
+    """
+    def __init__(self):
+        self.requests = itertools.count()
+
+    def __call__(self, attempt):
+        number = next(self.requests)
+        slow = attempt == 0 and number > HEDGE_SAMPLES and number % 10 == 5
+        return StubResponse(delay=2.0 if slow else 0.05)
+
+def outage(attempt):
+    """The server is down"""
+    return StubResponse(status=502, content_type="text/html", body=b"<html>Bad gateway</html>")
+
+# Expected behaviour of each scenario: (description, check of the run and the earlier runs by scenario name)
+DELIVERED_ALL = ("all chunks delivered", lambda run, runs: run.chunks == CHUNKS)
+RETRIED = ("failed requests retried", lambda run, runs: run.producer.retry_policy.retries > 0 and run.requests > CHUNKS)
+NOT_RETRIED = ("no retries", lambda run, runs: run.producer.retry_policy.retries == 0 and run.requests <= CHUNKS)
+DELIVERED_NONE = ("no chunks delivered", lambda run, runs: run.chunks == 0)
+CIRCUIT_CLOSED = ("circuit kept closed", lambda run, runs: run.producer.circuit_breaker.opens == 0 and run.requests == CHUNKS)
+
+SCENARIOS = [
+    ("transient 503", flaky, True, [DELIVERED_ALL, RETRIED]),
+    ("429 + Retry-After", rate_limited, True, [
+        DELIVERED_ALL, RETRIED,
+        ("waited the Retry-After before every retry",
+         lambda run, runs: abs(run.producer.retry_policy.waited_seconds - run.producer.retry_policy.retries * 1.0) < 1e-6),
+    ]),
+    ("bad Content-Type", wrong_content, True, [NOT_RETRIED, DELIVERED_NONE, CIRCUIT_CLOSED]),
+    ("400 bad request", rejected, True, [NOT_RETRIED, DELIVERED_NONE, CIRCUIT_CLOSED]),
+    ("slow tail, no hedging", SlowTail(), False, [DELIVERED_ALL, ("nothing hedged", lambda run, runs: run.producer.hedging.hedges == 0)]),
+    ("slow tail, hedged", SlowTail(), True, [
+        DELIVERED_ALL,
+        ("slow requests hedged", lambda run, runs: run.producer.hedging.hedges > 0),
+        ("at least twice as fast as without hedging", lambda run, runs: run.elapsed * 2 <= runs["slow tail, no hedging"].elapsed),
+    ]),
+    ("outage", outage, True, [
+        DELIVERED_NONE,
+        ("circuit opened", lambda run, runs: run.producer.circuit_breaker.opens >= 1),
+        ("stopped sending requests", lambda run, runs: run.requests < CHUNKS),
+    ]),
+]
+
+@dataclass
+class Run:
+    chunks: int  # delivered to the consumer
+    requests: int  # received by the server
+    elapsed: float
+    producer: object
+
+def chunked_text(tool, chunks: int = CHUNKS, name: str = "retry benchmark") -> str:
+    """A text of distinct chunks, which are requested CONCURRENCY at a time"""
+    filler = " and so on" * ((tool.MAX_CHUNK_SIZE - 100) // 10)
+    return " ".join(f"This is chunk number {i} of the {name}{filler}." for i in range(chunks))
+
+def run(tool, engine: str, behaviour, hedging: bool):
+    consumer = CountingConsumer()
+    with StubServer(behaviour) as server:
+        with contextlib.redirect_stdout(io.StringIO()):
+            producer_class = tool.AsyncTtsProducer if engine == "async" else tool.TtsProducer
+            producer = producer_class("voice-1", consumer, concurrency=CONCURRENCY, backend=tool.StubBackend(server.url))
+            producer.circuit_breaker = tool.CircuitBreaker(reset_timeout=1.0)  # Keep the outage scenario short
+            if not hedging:
+                producer.hedging.MIN_SAMPLES = float("inf")
+            start = time.perf_counter()
+            producer.put(chunked_text(tool))
+            producer.wait_for_completion()
+            elapsed = time.perf_counter() - start
+        return Run(consumer.chunks, server.requests, elapsed, producer)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--engine", choices=["threaded", "async"], default="threaded")
+    args = parser.parse_args()
+    tool = load_tool()
+    tool.HedgePolicy.MIN_SAMPLES = HEDGE_SAMPLES
+
+    print(f"{CHUNKS} chunks, {CONCURRENCY} in flight, {args.engine} engine")
+    print(f"  {'scenario':<22} {'chunks':>7} {'requests':>9} {'time':>7} {'retries':>8} {'hedged':>7} {'opened':>7}")
+    runs = {}
+    failures = []
+    for name, behaviour, hedging, expectations in SCENARIOS:
+        result = runs[name] = run(tool, args.engine, behaviour, hedging)
+        producer = result.producer
+        print(f"  {name:<22} {result.chunks:>7} {result.requests:>9} {result.elapsed:>6.2f}s {producer.retry_policy.retries:>8} "
+              f"{producer.hedging.hedges:>7} {producer.circuit_breaker.opens:>7}")
+        failures.extend(f"{name}: {description}" for description, check in expectations if not check(result, runs))
+    if failures:
+        raise SystemExit("Unexpected behaviour:\n  " + "\n  ".join(failures))
+    print("All scenarios behaved as expected")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Micro-benchmark of text sanitization: sanitize_text against the previous path
+(character filter, double-space replace and three replaces per chunk).
+
+Usage: python benchmarks/sanitize_benchmark.py
+"""
+from common import load_tool, best_time, sample_text
+
+SIZES_MB = [1, 4, 16]
+
+def legacy_sanitize(text: str) -> str:
+    """The sanitization steps as they were done before sanitize_text"""
+    text = ''.join(char for char in text if ord(char) < 128)
+    text = text.replace("  ", " ")
+    return text.replace("'", "").replace('"', '').replace("&", "and")
+
+def main():
+    tool = load_tool()
+    print(f"{'input':>8} {'non-ASCII':>10} {'legacy':>10} {'sanitize_text':>14} {'speed-up':>9}")
+    for size_mb in SIZES_MB:
+        for non_ascii in (False, True):
+            text = sample_text(size_mb * 1024 * 1024, non_ascii)
+            legacy = best_time(legacy_sanitize, text)
+            single_pass = best_time(tool.sanitize_text, text)
+            print(f"{size_mb:>6} MB {'yes' if non_ascii else 'no':>10} {legacy:>9.3f}s {single_pass:>13.3f}s {legacy / single_pass:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
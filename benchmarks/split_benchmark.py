@@ -0,0 +1,49 @@
+"""
+Benchmark of text chunking on inputs from 10 KB to 50 MB: iter_text_chunks against the previous
+split_text, which copied the remaining text after every chunk.
+
+Usage: python benchmarks/split_benchmark.py
+"""
+import time
+
+from common import load_tool, sample_text
+
+SIZES_KB = [10, 100, 1024, 10 * 1024, 50 * 1024]
+LEGACY_MAX_KB = 2 * 1024  # the previous implementation is quadratic, larger inputs take minutes
+CHUNK_SIZE = 1000
+
+def legacy_split_text(text: str, chunk_size: int = CHUNK_SIZE):
+    """split_text as it was before iter_text_chunks"""
+    chunks = []
+    while len(text) > 0:
+        if len(text) <= chunk_size:
+            chunks.append(text)
+            break
+        chunk = text[:chunk_size]
+        last_full_stop = chunk.rfind('.')
+        last_comma = chunk.rfind(',')
+        split_index = last_full_stop if last_full_stop != -1 else last_comma
+        if split_index == -1:
+            split_index = chunk_size
+        else:
+            split_index += 1
+        chunks.append(text[:split_index])
+        text = text[split_index:].lstrip()
+    return chunks
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def main():
+    tool = load_tool()
+    print(f"{'input':>10} {'chunks':>8} {'legacy':>10} {'iter_text_chunks':>17} {'per MB':>10}")
+    for size_kb in SIZES_KB:
+        text = sample_text(size_kb * 1024, non_ascii=False)
+        elapsed, chunks = timed(lambda: sum(1 for _ in tool.iter_text_chunks(text, lambda: CHUNK_SIZE)))
+        legacy = f"{timed(lambda: legacy_split_text(text))[0]:>9.3f}s" if size_kb <= LEGACY_MAX_KB else f"{'skipped':>10}"
+        print(f"{size_kb:>7} KB {chunks:>8} {legacy} {elapsed:>16.3f}s {elapsed / (size_kb / 1024):>9.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark of voice loading at startup: parsing voices.json and indexing it, against loading the
+compiled voice catalog. Runs on a copy of voices.json in a temporary folder.
+
+Usage: python benchmarks/startup_benchmark.py
+"""
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from common import REPO_DIR, load_tool
+
+RUNS = 50
+
+def median_ms(function) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def main():
+    tool = load_tool()
+    with tempfile.TemporaryDirectory() as folder:
+        voices_path = os.path.join(folder, "voices.json")
+        shutil.copy(os.path.join(REPO_DIR, "voices.json"), voices_path)
+
+        def load_json():
+            """Loading as before the catalog: parse the JSON, then index it"""
+            manager = tool.VoiceManager()
+            with open(voices_path, "r") as f:
+                manager.voices = json.load(f)
+            manager.build_index()
+
+        def load_cold():
+            """No catalog yet: parse, index and write the catalog"""
+            if os.path.exists(catalog_path):
+                os.remove(catalog_path)
+            manager = tool.VoiceManager()
+            manager.voices_path = voices_path
+            manager.load_voices()
+
+        def load_warm():
+            """Catalog up to date: load it in one go"""
+            manager = tool.VoiceManager()
+            manager.voices_path = voices_path
+            manager.load_voices()
+
+        probe = tool.VoiceManager()
+        probe.voices_path = voices_path
+        catalog_path = probe.catalog_path()
+
+        print(f"Voice loading, median of {RUNS} runs")
+        print(f"  voices.json + index:   {median_ms(load_json):7.2f} ms")
+        print(f"  catalog rebuild:       {median_ms(load_cold):7.2f} ms")
+        print(f"  compiled catalog:      {median_ms(load_warm):7.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Check that streaming playback hands over every chunk in order when some chunks come from the
+audio cache: a text of short sentences is split into one chunk per sentence, every other chunk
+is a cache hit, and the others are streamed with random download times. The consumer must get
+all chunks, in text order, at several concurrency levels. Exits with an error if it doesn't.
+
+Usage: python benchmarks/streaming_order_check.py
+"""
+import contextlib
+import io
+import random
+import time
+
+from common import load_tool
+
+CHUNKS = 12
+RUNS = 20
+
+class AlternateCache:
+    """Audio cache holding every even numbered chunk"""
+    def get(self, voice_id, text):
+        number = int(text.split()[1].rstrip("."))
+        return f"cached {number}".encode() if number % 2 == 0 else None
+
+    def put(self, voice_id, text, mp3_data):
+        pass
+
+    def save_index(self):
+        pass
+
+class CollectingConsumer:
+    """Keeps what it is handed; streams are read once the producer is done"""
+    def __init__(self):
+        self.items = []
+
+    def put(self, mp3_data, started_at=None):
+        self.items.append(mp3_data)
+
+    def wait_for_completion(self):
+        pass
+
+    def received(self) -> list:
+        return [item if isinstance(item, bytes) else b"".join(item) for item in self.items]
+
+def producer_class(tool, seed: int):
+    """TtsProducer streaming the chunk number as its audio, after a random delay"""
+    delays = random.Random(seed)
+
+    class LabelStreamingProducer(tool.TtsProducer):
+        def stream_audio(self, data, audio_stream, cancel_token=None):
+            time.sleep(delays.uniform(0, 0.02))
+            number = int(data["text"].split()[1].rstrip("."))
+            audio_stream.write(f"streamed {number}".encode())
+            return True
+
+    return LabelStreamingProducer
+
+def main():
+    tool = load_tool()
+    tool.MAX_CHUNK_SIZE = 12  # One sentence per chunk
+    text = " ".join(f"Chunk {number}." for number in range(1, CHUNKS + 1))
+    expected = [f"{'cached' if number % 2 == 0 else 'streamed'} {number}".encode() for number in range(1, CHUNKS + 1)]
+
+    failures = 0
+    for concurrency in (1, 2, 4):
+        for seed in range(RUNS):
+            consumer = CollectingConsumer()
+            with contextlib.redirect_stdout(io.StringIO()):
+                producer = producer_class(tool, seed)("voice-1", consumer, concurrency=concurrency, cache=AlternateCache(), streaming=True)
+                producer.put(text)
+                producer.wait_for_completion()
+            received = consumer.received()
+            if received != expected:
+                failures += 1
+                print(f"concurrency {concurrency}, seed {seed}: got {[item.decode() for item in received]}")
+        print(f"concurrency {concurrency}: {RUNS} runs checked")
+    if failures:
+        raise SystemExit(f"{failures} runs handed over chunks out of order or lost them")
+    print("All chunks were handed over in order")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Local HTTP server standing in for the Speechma API, to test and benchmark the tool offline.
+
+Every POST is answered by a behaviour function, called with the number of times the same request
+body was received before and returning a StubResponse, so scenarios can fail the first attempt
+of each chunk, throttle, answer slowly or go down entirely. Unless the response sets a body, the
+audio is silence as long as the requested text would take to speak, in valid mp3 frames.
+
+Run on its own, it answers like a working server with configurable latency, jitter and error
+rate, for use with the tool's --server option.
+
+Usage: python benchmarks/stub_server.py [--port PORT] [--latency SECONDS] [--jitter SECONDS] [--errorRate FRACTION]
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# MPEG 2 layer III frame of silence: 24 kHz mono at 32 kbps, 576 samples (24 ms) in 96 bytes,
+# with zeroed side information, so decoders output nothing but silence
+SILENT_FRAME = b"\xff\xf3\x44\xc4" + bytes(92)
+FRAME_SECONDS = 576 / 24000
+CHARS_PER_SECOND = 15  # speaking rate of the synthetic voice
+
+def silent_mp3(seconds: float) -> bytes:
+    """At least one frame of mp3 silence, lasting about the given number of seconds"""
+    return SILENT_FRAME * max(1, round(seconds / FRAME_SECONDS))
+
+def speech_for(text: str) -> bytes:
+    """Silent mp3 as long as the text would take to speak"""
+    return silent_mp3(len(text) / CHARS_PER_SECOND)
+
+@dataclass
+class StubResponse:
+    status: int = 200
+    content_type: str = "audio/mpeg"
+    body: bytes | None = None  # None for the speech of the requested text
+    delay: float = 0.0  # seconds before the response is sent
+    headers: dict = field(default_factory=dict)
+
+def always_ok(attempt: int) -> StubResponse:
+    return StubResponse()
+
+class SyntheticSpeech:
+    """
+    Behaviour of a working server: audio after `latency` seconds plus an exponentially distributed
+    extra delay averaging `jitter` seconds, which gives the long tail of a real service. A fraction
+    `error_rate` of the requests fails with a 503 after the same delay.
+    """
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def __call__(self, attempt: int) -> StubResponse:
+        with self.lock:
+            delay = self.latency + (self.random.expovariate(1 / self.jitter) if self.jitter else 0.0)
+            failed = self.random.random() < self.error_rate
+        if failed:
+            return StubResponse(status=503, content_type="text/plain", body=b"Service unavailable", delay=delay)
+        return StubResponse(delay=delay)
+
+def request_text(body: bytes) -> str:
+    """Text of a Speechma request body"""
+    try:
+        return str(json.loads(body).get("text", ""))
+    except (ValueError, AttributeError):
+        return ""
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)  # Clients drop the connections of failed and hedged requests
+
+class StubServer:
+    """Threaded HTTP server on a local port (a free one by default), answering requests with `behaviour`"""
+    def __init__(self, behaviour=always_ok, port: int = 0):
+        self.behaviour = behaviour
+        self.requests = 0
+        self.attempts = {}  # request body -> number of times it was received
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # Headers and body are written separately, do not delay the body
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server.lock:
+                    server.requests += 1
+                    attempt = server.attempts.get(body, 0)
+                    server.attempts[body] = attempt + 1
+                response = server.behaviour(attempt)
+                audio = response.body if response.body is not None else speech_for(request_text(body))
+                if response.delay:
+                    time.sleep(response.delay)
+                self.send_response(response.status)
+                self.send_header("Content-Type", response.content_type)
+                self.send_header("Content-Length", str(len(audio)))
+                for name, value in response.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(audio)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = QuietHTTPServer(("127.0.0.1", port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_port}/com.api/tts-api.php"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before every response (default: 0.3).")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Average extra seconds, exponentially distributed (default: 0.1).")
+    parser.add_argument("--errorRate", type=float, default=0.0, help="Fraction of requests failing with a 503 (default: 0).")
+    parser.add_argument("--seed", type=int, help="Seed of the random delays and errors, for repeatable runs.")
+    args = parser.parse_args()
+
+    with StubServer(SyntheticSpeech(args.latency, args.jitter, args.errorRate, args.seed), args.port) as server:
+        print(f"Stub server at {server.url}")
+        print(f"Use it with: python tts-helper-tool.py --server {server.url}")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+        print(f"{server.requests} requests answered")
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,10 @@ import requests as req
 import json
 import sys
 import os
+import random
+import time
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from typing import Dict
 
 # Function to print colored text
@@ -92,25 +95,48 @@ def get_voice_id(voices, choice, current_index=0):
                 return value, current_index
     return None, current_index
 
-# Function to get audio from the server
-def get_audio(url, data, headers):
+# Request timeouts, throttling and server errors may succeed when retried, other errors won't
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Function to read the seconds to wait from a Retry-After header, given in seconds or as a date
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+# Function to get audio from the server, reusing the session's kept-alive connection.
+# Returns (audio, retryable, retry_after): the audio, or None with whether the request is worth
+# retrying and the seconds the server asked to wait first, if it did
+def get_audio(session, url, data, headers):
     try:
         json_data = json.dumps(data)
-        response = req.post(url, data=json_data, headers=headers)
+        response = session.post(url, data=json_data, headers=headers, timeout=(10, 60))
         response.raise_for_status()
         if response.headers.get('Content-Type') == 'audio/mpeg':
-            return response.content
+            return response.content, False, None
         else:
             print_colored(f"Unexpected response format: {response.headers.get('Content-Type')}", "red")
-            return None
+            return None, False, None
     except req.exceptions.RequestException as e:
-        if e.response:
+        retry_after = None
+        if e.response is not None:
             print_colored(f"Server response: {e.response.text}", "red")
+            retryable = e.response.status_code in RETRYABLE_STATUS_CODES
+            retry_after = parse_retry_after(e.response.headers.get('Retry-After'))
+        else:
+            retryable = isinstance(e, (req.exceptions.ConnectionError, req.exceptions.Timeout))
         print_colored(f"Request failed: {e}", "red")
-        return None
+        return None, retryable, retry_after
     except Exception as e:
         print_colored(f"An unexpected error occurred: {e}", "red")
-        return None
+        return None, False, None
 
 # Function to save audio to a file
 def save_audio(response, directory, chunk_num):
@@ -238,6 +264,7 @@ def main():
 
     timestamp = datetime.now().strftime("%Y-%m-%d %H-%M-%S")
     directory = os.path.join("audio", timestamp)
+    session = req.Session()
     
     for i, chunk in enumerate(chunks, start=1):
         print_colored(f"\nProcessing chunk {i}...", "yellow")
@@ -248,12 +275,18 @@ def main():
 
         max_retries = 3
         for retry in range(max_retries):
-            response = get_audio(url, data, headers)
+            response, retryable, retry_after = get_audio(session, url, data, headers)
             if response:
                 save_audio(response, directory, i)
                 break
-            else:
-                print_colored(f"Retry {retry + 1} for chunk {i}...", "yellow")
+            elif not retryable:
+                print_colored(f"Failed to process chunk {i}, retrying would not help.", "red")
+                break
+            elif retry + 1 < max_retries:
+                # Wait as long as the server asks, or back off exponentially with full jitter
+                delay = retry_after if retry_after is not None else random.uniform(0, 0.5 * 2 ** retry)
+                print_colored(f"Retry {retry + 1} for chunk {i} in {delay:.1f} s...", "yellow")
+                time.sleep(delay)
         else:
             print_colored(f"Failed to process chunk {i} after {max_retries} retries.", "red")
 
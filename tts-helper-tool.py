@@ -1,13 +1,45 @@
 from typing import Dict
+from abc import ABC, abstractmethod
 from enum import Enum
-import requests
 import json
 import sys
 import io
 import threading
 import queue
 import argparse
+import contextlib
+import glob
+import itertools
 import os
+import hashlib
+import heapq
+import pickle
+import random
+import re
+import time
+import unicodedata
+from collections import deque, OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor, Future, FIRST_COMPLETED, wait as wait_for_futures
+
+# Text chunk sizes in characters: the first chunk of a text when chunking adaptively, and the maximum
+FIRST_CHUNK_SIZE = 150
+MAX_CHUNK_SIZE = 1000
+
+# Seconds to wait for the connection opened ahead of the first request
+PREWARM_TIMEOUT = 10
+# Default seconds to wait for a connection to the server, and for data from it, before a request fails
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_POOL_SIZE = None  # derived from the concurrency, see connection_pool_size()
+
+# Size of the pieces read from streamed HTTP responses and from the streaming decoder
+STREAM_READ_SIZE = 4096
+# Texts waiting for synthesis before put() blocks the caller
+MAX_PENDING_TEXTS = 64
+# Seconds of audio written to the output device at once, which bounds how long a flush takes to silence it
+WRITE_SLICE_SECONDS = 0.02
+# Seconds between checks for data appended to a followed file
+FOLLOW_POLL_INTERVAL = 0.05
 
 # Function to print colored text
 def print_colored(text: str, color: str) -> None:
@@ -59,31 +91,7 @@ def display_header():
     print_colored("TTS Helper Tool", "magenta")
     print_colored("=" * 60, "cyan")
 
-def get_all_voice_ids(data):
-    """Recursively get all voice IDs from nested structure"""
-    for key, value in data.items():
-        if isinstance(value, dict):
-            yield from get_all_voice_ids(value)
-        else:
-            yield value
-
-def count_voices_by_level(voices, level=0):
-    """Count voices at different hierarchy levels"""
-    counts = {}
-
-    def count_recursive(data, current_level=0):
-        for key, value in data.items():
-            if isinstance(value, dict):
-                if current_level == level:
-                    # Count voices under this key
-                    voice_count = sum(1 for _ in get_all_voice_ids(value))
-                    counts[key] = voice_count
-                count_recursive(value, current_level + 1)
-
-    count_recursive(voices)
-    return counts
-
-def select_voice_interactive(voices):
+def select_voice_interactive(voice_manager):
     """
     Interactive voice selection with hierarchical filtering.
     Returns: (voice_id, voice_name) tuple or (None, None) if cancelled
@@ -98,11 +106,10 @@ def select_voice_interactive(voices):
         print_colored("STEP 1: Select Language", "blue")
         print_colored("="*60, "blue")
 
-        lang_counts = count_voices_by_level(voices, level=0)
-        languages = sorted(lang_counts.keys())
+        languages = voice_manager.children[()]
 
         for i, lang in enumerate(languages, 1):
-            count = lang_counts[lang]
+            count = voice_manager.voice_counts[(lang,)]
             print(f"{i}. {lang} ({count} voices)")
 
         print_colored("\nType 'voice-XXX' to directly enter a voice ID, or 'q' to quit", "yellow")
@@ -132,12 +139,10 @@ def select_voice_interactive(voices):
             print_colored(f"STEP 2: Select Country ({selected_language})", "blue")
             print_colored("="*60, "blue")
 
-            country_data = voices[selected_language]
-            country_counts = count_voices_by_level({selected_language: country_data}, level=1)
-            countries = sorted(country_counts.keys())
+            countries = voice_manager.children[(selected_language,)]
 
             for i, country in enumerate(countries, 1):
-                count = country_counts[country]
+                count = voice_manager.voice_counts[(selected_language, country)]
                 print(f"{i}. {country} ({count} voices)")
 
             print_colored("\nType 'b' to go back, 'r' to restart, or 'q' to quit", "yellow")
@@ -147,7 +152,7 @@ def select_voice_interactive(voices):
             if country_input.lower() == 'b':
                 break  # Go back to language selection
             if country_input.lower() == 'r':
-                return select_voice_interactive(voices)  # Restart
+                return select_voice_interactive(voice_manager)  # Restart
             if country_input.lower() == 'q':
                 return None, None
 
@@ -168,11 +173,10 @@ def select_voice_interactive(voices):
                 print_colored(f"STEP 3: Select Gender ({selected_language} - {selected_country})", "blue")
                 print_colored("="*60, "blue")
 
-                gender_data = country_data[selected_country]
-                genders = sorted(gender_data.keys())
+                genders = voice_manager.children[(selected_language, selected_country)]
 
                 for i, gender in enumerate(genders, 1):
-                    count = len(gender_data[gender])
+                    count = voice_manager.voice_counts[(selected_language, selected_country, gender)]
                     print(f"{i}. {gender.capitalize()} ({count} voices)")
 
                 print_colored("\nType 'b' to go back, 'r' to restart, or 'q' to quit", "yellow")
@@ -182,7 +186,7 @@ def select_voice_interactive(voices):
                 if gender_input.lower() == 'b':
                     break  # Go back to country selection
                 if gender_input.lower() == 'r':
-                    return select_voice_interactive(voices)  # Restart
+                    return select_voice_interactive(voice_manager)  # Restart
                 if gender_input.lower() == 'q':
                     return None, None
 
@@ -204,8 +208,8 @@ def select_voice_interactive(voices):
                     print_colored(f"{selected_language} - {selected_country} - {selected_gender.capitalize()}", "cyan")
                     print_colored("="*60, "blue")
 
-                    voice_names = gender_data[selected_gender]
-                    sorted_names = sorted(voice_names.keys())
+                    voice_path = (selected_language, selected_country, selected_gender)
+                    sorted_names = voice_manager.children[voice_path]
 
                     # Ask if user wants to see voice IDs
                     show_ids_input = input_colored("\nShow voice IDs? (y/n, default: n): ", "blue").lower().strip()
@@ -214,7 +218,7 @@ def select_voice_interactive(voices):
                     if show_ids_input == 'b':
                         break  # Go back to gender selection
                     if show_ids_input == 'r':
-                        return select_voice_interactive(voices)  # Restart
+                        return select_voice_interactive(voice_manager)  # Restart
                     if show_ids_input == 'q':
                         return None, None
 
@@ -222,7 +226,7 @@ def select_voice_interactive(voices):
 
                     print()
                     for i, name in enumerate(sorted_names, 1):
-                        voice_id = voice_names[name]
+                        voice_id = voice_manager.voice_ids[voice_path + (name,)]
                         if show_ids:
                             print(f"{i}. {name} \033[90m({voice_id})\033[0m")
                         else:
@@ -235,7 +239,7 @@ def select_voice_interactive(voices):
                     if voice_input.lower() == 'b':
                         break  # Go back to gender selection
                     if voice_input.lower() == 'r':
-                        return select_voice_interactive(voices)  # Restart
+                        return select_voice_interactive(voice_manager)  # Restart
                     if voice_input.lower() == 'q':
                         return None, None
 
@@ -249,7 +253,7 @@ def select_voice_interactive(voices):
                         continue
 
                     selected_name = sorted_names[voice_choice - 1]
-                    selected_voice_id = voice_names[selected_name]
+                    selected_voice_id = voice_manager.voice_ids[voice_path + (selected_name,)]
 
                     # Show final selection
                     print_colored("\n" + "="*60, "green")
@@ -264,190 +268,2787 @@ def select_voice_interactive(voices):
 
                     return selected_voice_id, selected_name
 
-class TtsProducer:
-    """Text to speech producer that obtains mp3 in a separate thread and passes them to a consumer"""
-    def __init__(self, voice_id, nextConsumer):
+# Bitrates in kbps for MPEG audio layer III, indexed by the 4-bit bitrate index
+MP3_BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+# Sample rates in Hz, indexed by the 2-bit version ID and then the 2-bit sample rate index
+MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG 1
+    2: [22050, 24000, 16000],  # MPEG 2
+    0: [11025, 12000, 8000],   # MPEG 2.5
+}
+
+def parse_mp3_frame_header(data, offset: int = 0):
+    """
+    Parse the MPEG audio layer III frame header found at an offset.
+    Args:
+        data: mp3 data.
+        offset: Position of the candidate frame header.
+    Returns:
+        (frame_length, sample_rate, channels, samples_per_frame) tuple, or None if there is no valid header.
+    """
+    if offset + 4 > len(data) or data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x03
+    layer = (data[offset + 1] >> 1) & 0x03
+    bitrate_index = data[offset + 2] >> 4
+    sample_rate_index = (data[offset + 2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    padding = (data[offset + 2] >> 1) & 0x01
+    bitrate = MP3_BITRATES["mpeg1" if version == 3 else "mpeg2"][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][sample_rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+    frame_length = samples_per_frame // 8 * bitrate // sample_rate + padding
+    channels = 1 if (data[offset + 3] >> 6) == 0x03 else 2
+    return frame_length, sample_rate, channels, samples_per_frame
+
+def skip_id3v2_tag(data) -> int:
+    """Return the offset of the first byte after a leading ID3v2 tag (0 if there is none)"""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def find_mp3_frame(data, offset: int = 0):
+    """
+    Find the first mp3 frame at or after an offset, skipping any ID3v2 tag.
+    Returns:
+        (offset, frame header tuple) or None if no complete frame header was found.
+    """
+    position = max(offset, skip_id3v2_tag(data))
+    while True:
+        position = data.find(b"\xff", position)
+        if position == -1:
+            return None
+        header = parse_mp3_frame_header(data, position)
+        if header is not None:
+            return position, header
+        position += 1
+
+def mp3_side_info_length(header: tuple) -> int:
+    """Length of the layer III side information that follows the 4-byte frame header (without CRC)"""
+    _, _, channels, samples_per_frame = header
+    if samples_per_frame == 1152:
+        return 32 if channels == 2 else 17
+    return 17 if channels == 2 else 9
+
+def is_mp3_info_frame(data, offset: int, header: tuple) -> bool:
+    """Whether the frame at an offset is a Xing/Info or VBRI header frame rather than audio"""
+    side_info_end = offset + 4 + mp3_side_info_length(header)
+    return data[side_info_end:side_info_end + 4] in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI"
+
+def iter_mp3_frames(data):
+    """
+    Iterate over the complete audio frames in mp3 data, skipping ID3 tags, Xing/Info/VBRI
+    header frames and any bytes between frames.
+    Yields:
+        (offset, frame header tuple) for each frame.
+    """
+    found = find_mp3_frame(data)
+    while found is not None:
+        position, header = found
+        frame_length = header[0]
+        if position + frame_length > len(data):
+            return
+        if not is_mp3_info_frame(data, position, header):
+            yield position, header
+        next_header = parse_mp3_frame_header(data, position + frame_length)
+        found = (position + frame_length, next_header) if next_header is not None else find_mp3_frame(data, position + 1)
+
+def mp3_duration(data) -> float:
+    """Duration in seconds of the mp3 frames in the data"""
+    return sum(samples_per_frame / sample_rate for _, (_, sample_rate, _, samples_per_frame) in iter_mp3_frames(data))
+
+class Mp3FileWriter:
+    """
+    Consumer that joins mp3 chunks into one mp3 file without re-encoding.
+
+    The audio frames of each chunk are appended to the file as the chunk arrives, so memory
+    use doesn't grow with the length of the text. ID3 tags and the Xing/Info header frames of
+    the chunks are dropped; the file starts with a single Info (or Xing, if the bitrate varies)
+    frame instead, which is rewritten with the total frame and byte counts when the file is
+    finished so that players show the correct duration. The file is written under a .part
+    name until then.
+    """
+    XING_FLAGS = 0x0003  # frame and byte count fields present
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.part_path = f"{output_path}.part"
+        self.format = None  # (sample_rate, channels, samples_per_frame) of the first chunk
+        self.header_bytes = None  # header of the first audio frame, template for the Info frame
+        self.info_frame_length = 0
+        self.frame_count = 0
+        self.audio_bytes = 0
+        self.bitrates = set()
+        self.finished = False
+        self.written = False
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds of the audio written so far"""
+        if self.format is None:
+            return 0.0
+        sample_rate, _, samples_per_frame = self.format
+        return self.frame_count * samples_per_frame / sample_rate
+
+    def build_info_frame(self) -> bytes:
+        """Build the Info/Xing frame for the frames written so far, using the format of the first frame"""
+        header = bytearray(self.header_bytes)
+        header[1] |= 0x01  # no CRC
+        header[2] &= ~0x02 & 0xFF  # no padding
+        side_info_length = mp3_side_info_length(parse_mp3_frame_header(header))
+        needed = 4 + side_info_length + 16
+        # Very low bitrates give frames too short for the tag; any bitrate of the same format will do
+        frame_length = parse_mp3_frame_header(header)[0]
+        while frame_length < needed and (header[2] >> 4) < 14:
+            header[2] += 0x10
+            frame_length = parse_mp3_frame_header(header)[0]
+
+        tag = b"Xing" if len(self.bitrates) > 1 else b"Info"
+        frame = bytearray(frame_length)
+        frame[:4] = header
+        fields = tag + self.XING_FLAGS.to_bytes(4, "big") + self.frame_count.to_bytes(4, "big") \
+            + (frame_length + self.audio_bytes).to_bytes(4, "big")
+        frame[4 + side_info_length:needed] = fields
+        return bytes(frame)
+
+    def put(self, mp3_byte_data, started_at: float | None = None):
+        """Append the audio frames of an mp3 chunk to the file"""
+        if self.finished:
+            print_colored(f"Ignoring audio for '{self.output_path}', the file is already finished", "yellow")
+            return
+        frames = bytearray()
+        frame_count = 0
+        for position, header in iter_mp3_frames(mp3_byte_data):
+            frame_length, sample_rate, channels, samples_per_frame = header
+            if self.format is None:
+                self.format = (sample_rate, channels, samples_per_frame)
+                self.header_bytes = bytes(mp3_byte_data[position:position + 4])
+            elif self.format != (sample_rate, channels, samples_per_frame):
+                print_colored(f"Skipping an mp3 chunk for '{self.output_path}' with a different sample rate or channel count", "red")
+                return
+            self.bitrates.add(mp3_byte_data[position + 2] >> 4)
+            frames += mp3_byte_data[position:position + frame_length]
+            frame_count += 1
+        if not frame_count:
+            print_colored(f"No mp3 frames found in audio for '{self.output_path}'", "red")
+            return
+
+        try:
+            if self.info_frame_length == 0:
+                # Reserve room for the Info frame; it is rewritten with the final counts by finish()
+                info_frame = self.build_info_frame()
+                self.info_frame_length = len(info_frame)
+                with open(self.part_path, "wb") as fh:
+                    fh.write(info_frame)
+            with open(self.part_path, "ab") as fh:
+                fh.write(frames)
+        except OSError as e:
+            print_colored(f"Failed to write '{self.part_path}': {e}", "red")
+            return
+        self.frame_count += frame_count
+        self.audio_bytes += len(frames)
+
+    def finish(self) -> bool:
+        """Write the final Info frame and move the file into place. Returns True if the file was written"""
+        if self.finished:
+            return self.written
+        self.finished = True
+        if not self.frame_count:
+            print_colored(f"No audio was written to '{self.output_path}'", "red")
+            return False
+        try:
+            with open(self.part_path, "r+b") as fh:
+                fh.write(self.build_info_frame())
+            os.replace(self.part_path, self.output_path)
+        except OSError as e:
+            print_colored(f"Failed to finish '{self.output_path}': {e}", "red")
+            return False
+        self.written = True
+        print_colored(f"Audio saved to {self.output_path} ({self.duration:.1f} s)", "green")
+        return True
+
+    def discard(self) -> None:
+        """Finish without writing the file, removing the audio written so far"""
+        self.finished = True
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print_colored(f"Failed to remove '{self.part_path}': {e}", "red")
+
+    def wait_for_completion(self):
+        self.finish()
+
+class AudioStream:
+    """
+    mp3 data that is still being downloaded.
+
+    The producer writes pieces as they arrive from the server and the player reads them by
+    iterating over the stream, which blocks until more data arrives or the download finishes.
+    The data is kept once, in `received`; the reader is only told how far it extends. `seconds`
+    is the duration of the complete frames received so far, and `played_seconds` how much of it
+    the player has written to the device, so buffered audio can be counted while it downloads.
+    """
+    def __init__(self):
+        self.ends = queue.Queue()  # length of `received` after each write, None once finished
+        self.received = bytearray()
+        self.complete = False
+        self.seconds = 0.0
+        self.played_seconds = 0.0
+        self.scanned = 0  # offset in `received` up to which frames were counted
+
+    def write(self, piece: bytes) -> None:
+        self.received += piece
+        self.count_frames()
+        self.ends.put(len(self.received))
+
+    def count_frames(self) -> None:
+        """Add the duration of the frames completed by the last write to `seconds`"""
+        found = find_mp3_frame(self.received, self.scanned)
+        while found is not None:
+            position, header = found
+            frame_length, sample_rate, _, samples_per_frame = header
+            if position + frame_length > len(self.received):
+                return
+            if not is_mp3_info_frame(self.received, position, header):
+                self.seconds += samples_per_frame / sample_rate
+            self.scanned = position + frame_length
+            found = find_mp3_frame(self.received, self.scanned)
+
+    def finish(self, complete: bool) -> None:
+        """Mark the end of the download; complete is False if it was cut short"""
+        self.complete = complete
+        self.ends.put(None)
+
+    def release(self) -> None:
+        """Drop the received data once the stream was played and the producer is done with it"""
+        self.received = bytearray()
+
+    def __iter__(self):
+        start = 0
+        while True:
+            end = self.ends.get()
+            if end is None:
+                return
+            yield bytes(self.received[start:end])
+            start = end
+
+class AudioCache:
+    """
+    Persistent, content-addressed cache of synthesized mp3 chunks.
+
+    Entries are keyed by a hash of the voice ID and the sanitized chunk text, stored as
+    sharded mp3 files (<cache_dir>/<first two hex digits>/<key>.mp3) and tracked in an index
+    file that keeps them in least-recently-used order. Once the cache exceeds its byte budget
+    the least recently used entries are evicted. The index is saved on exit, together with a marker
+    that is removed again before the next entry is written. Without the marker, e.g. after a crash,
+    the shard directories are scanned on startup for entries written since the last save.
+    """
+    INDEX_FILE = "index.json"
+    CLEAN_MARKER_FILE = "index.clean"  # present while the index lists every entry file
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: OrderedDict = OrderedDict()  # key -> size in bytes, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dirty = False
+        self.marked_clean = False
+        self.load_index()
+
+    @staticmethod
+    def make_key(voice_id: str, text: str) -> str:
+        """Build the cache key for a voice ID and sanitized chunk text"""
+        return hashlib.sha256(f"{voice_id}\n{text}".encode("utf-8")).hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def load_index(self) -> None:
+        """
+        Load the index file. Unless it was marked clean, drop the entries whose mp3 file has gone
+        missing and add the mp3 files it misses; a clean index is trusted, and get() forgets entries
+        whose file was removed since.
+        """
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        entries = []
+        try:
+            with open(index_path, "r", encoding="utf-8") as fh:
+                entries = json.load(fh).get("entries", [])
+            self.marked_clean = os.path.exists(os.path.join(self.cache_dir, self.CLEAN_MARKER_FILE))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print_colored(f"Rebuilding unreadable audio cache index '{index_path}': {e}", "yellow")
+
+        for key, size in entries:
+            if self.marked_clean or os.path.exists(self.entry_path(key)):
+                self.entries[key] = size
+                self.total_bytes += size
+            else:
+                self.dirty = True
+        if not self.marked_clean:
+            self.scan_entries()
+        for old_key in self.evict_over_budget():
+            self.remove_entry_file(old_key)
+
+    def scan_entries(self) -> None:
+        """Add the mp3 files in the shard directories that are not in the index, as the most recently used in order of writing"""
+        found = []
+        try:
+            shards = [shard.path for shard in os.scandir(self.cache_dir) if len(shard.name) == 2 and shard.is_dir()]
+        except OSError:
+            return  # No cache yet
+        for shard in shards:
+            try:
+                with os.scandir(shard) as files:
+                    for file in files:
+                        key, extension = os.path.splitext(file.name)
+                        if extension == ".mp3" and key not in self.entries:
+                            stat = file.stat()
+                            found.append((stat.st_mtime, key, stat.st_size))
+            except OSError:
+                continue
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+            self.dirty = True
+
+    def save_index(self) -> None:
+        """Write the index file if it changed since it was last saved or isn't marked clean, and mark it clean"""
+        with self.lock:
+            if not self.dirty and self.marked_clean:
+                return
+            entries = list(self.entries.items())
+            self.dirty = False
+
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump({"entries": entries}, fh)
+            os.replace(tmp_path, index_path)
+            with self.lock:
+                if not self.dirty:  # Otherwise entries were written meanwhile, the next save marks it
+                    with open(os.path.join(self.cache_dir, self.CLEAN_MARKER_FILE), "wb"):
+                        pass
+                    self.marked_clean = True
+        except OSError as e:
+            print_colored(f"Failed to save audio cache index '{index_path}': {e}", "red")
+
+    def mark_unclean(self) -> bool:
+        """
+        Called before an entry file is written, which the saved index doesn't list: keeps the next
+        save from marking the index clean before it does, and removes the marker if there is one.
+        Returns False if the marker can't be removed.
+        """
+        with self.lock:
+            self.dirty = True
+            if not self.marked_clean:
+                return True
+            try:
+                os.remove(os.path.join(self.cache_dir, self.CLEAN_MARKER_FILE))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print_colored(f"Failed to update the audio cache index: {e}", "red")
+                return False
+            self.marked_clean = False
+            return True
+
+    def get(self, voice_id: str, text: str) -> bytes | None:
+        """Return the cached mp3 data for a chunk, or None on a miss"""
+        key = self.make_key(voice_id, text)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.dirty = True
+
+        try:
+            with open(self.entry_path(key), "rb") as fh:
+                mp3_data = fh.read()
+        except OSError:
+            mp3_data = None
+
+        with self.lock:
+            if mp3_data:
+                self.hits += 1
+                return mp3_data
+            # The file vanished or is unreadable: forget about it
+            self.misses += 1
+            size = self.entries.pop(key, None)
+            if size is not None:
+                self.total_bytes -= size
+            return None
+
+    def put(self, voice_id: str, text: str, mp3_data: bytes) -> None:
+        """Store the mp3 data for a chunk and evict old entries if over budget"""
+        if not mp3_data or len(mp3_data) > self.max_bytes:
+            return
+        key = self.make_key(voice_id, text)
+        path = self.entry_path(key)
+        if not self.mark_unclean():
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as fh:
+                fh.write(mp3_data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print_colored(f"Failed to write audio cache entry: {e}", "red")
+            return
+
+        with self.lock:
+            previous_size = self.entries.pop(key, 0)
+            self.entries[key] = len(mp3_data)
+            self.total_bytes += len(mp3_data) - previous_size
+            self.dirty = True
+            evicted = self.evict_over_budget()
+
+        for old_key in evicted:
+            self.remove_entry_file(old_key)
+
+    def evict_over_budget(self) -> list:
+        """Drop the least recently used entries until the cache fits its budget. Returns their keys"""
+        evicted = []
+        while self.total_bytes > self.max_bytes and self.entries:
+            old_key, old_size = self.entries.popitem(last=False)
+            self.total_bytes -= old_size
+            self.evictions += 1
+            self.dirty = True
+            evicted.append(old_key)
+        return evicted
+
+    def remove_entry_file(self, key: str) -> None:
+        try:
+            os.remove(self.entry_path(key))
+        except OSError:
+            pass
+
+    def display_stats(self) -> None:
+        print_colored(f"Audio cache: {self.hits} hits, {self.misses} misses, {self.evictions} evictions, "
+                      f"{len(self.entries)} entries ({self.total_bytes / (1024 * 1024):.1f} MB)", "cyan")
+
+# ASCII characters the speechma API handles badly, and what to send instead
+ASCII_REPLACEMENTS = {"'": "", '"': "", "&": "and"}
+# Transliterations of common non-ASCII characters. Other characters fall back to their Unicode
+# decomposition with the accents dropped, or are removed if there is no ASCII equivalent.
+TRANSLITERATIONS = {
+    "\u2018": "", "\u2019": "", "\u201a": "", "\u201b": "",  # single quotes
+    "\u201c": "", "\u201d": "", "\u201e": "", "\u201f": "", "\u00ab": "", "\u00bb": "",  # double quotes
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-", "\u2015": "-", "\u2212": "-",
+    "\u2026": "...", "\u00a0": " ", "\u2009": " ", "\u202f": " ", "\u200b": "",
+    "\u2022": ",", "\u00b7": ",", "\u00df": "ss", "\u00e6": "ae", "\u00c6": "AE", "\u0153": "oe", "\u0152": "OE",
+    "\u00f8": "o", "\u00d8": "O", "\u0142": "l", "\u0141": "L", "\u0111": "d", "\u0110": "D",
+    "\u20ac": " euro", "\u00a3": " pounds", "\u00b0": " degrees",
+}
+
+class SanitizeTable(dict):
+    """
+    str.translate table of the replacements above, keyed by code point. Other characters are looked
+    up once and remembered: ASCII is kept, non-ASCII is transliterated.
+    """
+    def __missing__(self, codepoint: int) -> int | str:
+        if codepoint < 0x80:
+            replacement = codepoint
+        else:
+            decomposed = unicodedata.normalize("NFKD", chr(codepoint))
+            replacement = "".join(part for part in decomposed if part < "\x80")
+        self[codepoint] = replacement
+        return replacement
+
+SANITIZE_TABLE = SanitizeTable({ord(char): replacement for char, replacement in (ASCII_REPLACEMENTS | TRANSLITERATIONS).items()})
+REPEATED_SPACES_PATTERN = re.compile("  +")  # Faster than " {2,}", the regex engine searches for the literal prefix
+
+def sanitize_text(text: str) -> str:
+    """
+    Prepare text for the speechma API: transliterate non-ASCII characters, drop quotes, spell out
+    '&' and collapse repeated spaces.
+
+    All replacements are done by a single str.translate over the text, and the spaces are collapsed
+    by a single regex pass over its result.
+    """
+    return REPEATED_SPACES_PATTERN.sub(" ", text.translate(SANITIZE_TABLE))
+
+# Sentence ends: runs of terminators (which covers ellipses), optionally followed by closing
+# brackets, that are followed by whitespace or the end of the text. A newline always ends a sentence.
+SENTENCE_END_PATTERN = re.compile(r"[.!?;]+[)\]]*(?=\s|$)|\n")
+
+def iter_text_chunks(text: str, next_chunk_size):
+    """
+    Split text into chunks lazily, preferring to end each chunk at a sentence end, then at a comma.
+    Args:
+        text: Text to split.
+        next_chunk_size: Callable returning the maximum size of the next chunk.
+    Yields:
+        Chunks of text, without leading whitespace.
+
+    The text is walked with indices and only the window of the current chunk is searched, so the
+    work is linear in the length of the text.
+    """
+    length = len(text)
+    start = 0
+    while start < length:
+        while start < length and text[start].isspace():
+            start += 1
+        if start == length:
+            return
+
+        end = start + next_chunk_size()
+        if end >= length:
+            yield text[start:]
+            return
+
+        # Look one character past the window so the lookahead sees what follows a terminator at its edge
+        split_index = -1
+        for match in SENTENCE_END_PATTERN.finditer(text, start, end + 1):
+            if match.end() <= end:
+                split_index = match.end()
+        if split_index == -1:
+            split_index = text.rfind(",", start, end) + 1 or end
+
+        yield text[start:split_index]
+        start = split_index
+
+# Inline voice switches such as "[voice-35] Hello", which apply until the next switch
+VOICE_MARKUP_PATTERN = re.compile(r"\[(voice-\d+)\]")
+
+def split_voice_markup(text: str, voice_id: str, is_valid_voice=None):
+    """
+    Split text at [voice-XXX] switches.
+    Args:
+        is_valid_voice: Function telling whether a voice ID exists, e.g. VoiceManager.is_valid_voice.
+            Switches to other voices are reported and ignored, keeping the previous voice.
+    Returns:
+        List of (voice_id, text) segments; text before the first switch uses the given voice.
+    """
+    segments = []
+    parts = VOICE_MARKUP_PATTERN.split(text)
+    # re.split alternates text and captured voice IDs: text, voice, text, voice, text...
+    segment_voice = voice_id
+    for index in range(0, len(parts), 2):
+        if index > 0:
+            if is_valid_voice is None or is_valid_voice(parts[index - 1]):
+                segment_voice = parts[index - 1]
+            else:
+                print_colored(f"Unknown voice ID '{parts[index - 1]}' in the text, keeping voice '{segment_voice}'", "yellow")
+        if parts[index].strip():
+            segments.append((segment_voice, parts[index]))
+    return segments
+
+def last_voice_switch(text: str, voice_id: str | None, end: int | None = None) -> str | None:
+    """Voice of the last [voice-XXX] switch in text (before end), or voice_id if there is none"""
+    if "[voice-" in text:
+        for match in VOICE_MARKUP_PATTERN.finditer(text, 0, len(text) if end is None else end):
+            voice_id = match.group(1)
+    return voice_id
+
+def with_voice_switch(text: str, voice_id: str | None) -> str:
+    """Prefix text that continues a longer text with the voice switch in effect where it starts, if any"""
+    return f"[{voice_id}] {text}" if voice_id else text
+
+def iter_voice_chunks(text: str, voice_id: str, next_chunk_size, is_valid_voice=None):
+    """
+    Sanitize and split text that may contain [voice-XXX] switches, ignoring switches to voices
+    is_valid_voice() rejects.
+    Yields:
+        (voice_id, chunk) pairs, in text order.
+    """
+    found = False
+    for segment_voice, segment in split_voice_markup(text, voice_id, is_valid_voice):
+        for chunk in iter_text_chunks(sanitize_text(segment), next_chunk_size):
+            found = True
+            yield segment_voice, chunk
+    if not found:
+        print_colored("Error: No text provided to split.", "red")
+
+class SentenceSegmenter:
+    """
+    Splits text into sentences as it arrives.
+
+    Sentences end where SENTENCE_END_PATTERN matches, i.e. at sentence punctuation followed by
+    whitespace or at a line break. Text after the last sentence end is kept as pending until more
+    text completes it. Punctuation at the very end of the text fed so far is held back too, as the
+    next piece may continue it ("3." followed by "14"), unless the text is declared complete;
+    `held_back` tells whether a sentence waits for that. Each feed only searches the new text and
+    the punctuation held back before it.
+    """
+    END_CHARACTERS = ".!?;)]"  # characters a sentence end that continues into the next feed can start with
+
+    def __init__(self):
+        self.pending = ""
+        self.scanned = 0  # position in pending before which no sentence end can start
+        self.held_back = False  # pending ends with a sentence end that the next text may continue
+
+    def feed(self, text: str, complete: bool = False) -> list:
+        """
+        Add text and return the sentences it completed, each with its trailing punctuation.
+        With `complete`, no more text follows, so punctuation at the end of the text ends a sentence.
+        """
+        self.pending += text
+        sentences = []
+        start = 0
+        self.held_back = False
+        for match in SENTENCE_END_PATTERN.finditer(self.pending, self.scanned):
+            if match.end() == len(self.pending) and match.group() != "\n" and not complete:
+                self.held_back = True
+                break
+            sentences.append(self.pending[start:match.end()])
+            start = match.end()
+        self.pending = self.pending[start:]
+        self.scanned = len(self.pending.rstrip(self.END_CHARACTERS))
+        return sentences
+
+    def flush(self) -> str:
+        """Return and clear the unfinished sentence"""
+        pending, self.pending = self.pending, ""
+        self.scanned = 0
+        self.held_back = False
+        return pending
+
+class AdaptiveChunkSizer:
+    """
+    Chooses the size of each text chunk while a text is being split.
+
+    The first chunk of every text is kept short so that playback starts quickly. Later chunks
+    double in size towards the maximum, to cut per-request overhead, as long as the audio already
+    buffered in the player covers the time the server is expected to need for them. When the
+    buffer runs low compared to the measured request latency the chunks shrink again.
+    """
+    GROWTH_FACTOR = 2
+    LATENCY_SMOOTHING = 0.3  # weight of the newest measurement in the moving average
+
+    def __init__(self, first_size: int, max_size: int, player=None):
+        self.first_size = first_size
+        self.max_size = max_size
+        self.player = player
+        self.seconds_per_char = None  # moving average of request latency per character
+        self.current_size = None  # None until the first chunk of a text was sized
+
+    def start_text(self) -> None:
+        """Start over with a short chunk for a new text"""
+        self.current_size = None
+
+    def record_request(self, chars: int, seconds: float) -> None:
+        """Feed the measured latency of a completed request"""
+        if chars <= 0:
+            return
+        sample = seconds / chars
+        if self.seconds_per_char is None:
+            self.seconds_per_char = sample
+        else:
+            self.seconds_per_char += self.LATENCY_SMOOTHING * (sample - self.seconds_per_char)
+
+    def next_chunk_size(self) -> int:
+        if self.current_size is None:
+            self.current_size = self.first_size
+            return self.current_size
+
+        grown = min(self.max_size, self.current_size * self.GROWTH_FACTOR)
+        buffered = self.player.buffered_seconds() if self.player is not None and hasattr(self.player, "buffered_seconds") else None
+        if self.seconds_per_char is None or buffered is None:
+            # Nothing measured yet: later chunks are played after the earlier ones, so growing is safe
+            self.current_size = grown
+        elif buffered >= grown * self.seconds_per_char:
+            self.current_size = grown
+        elif buffered < self.current_size * self.seconds_per_char:
+            self.current_size = max(self.first_size, self.current_size // self.GROWTH_FACTOR)
+        return self.current_size
+
+class PrefetchScheduler:
+    """
+    Paces chunk requests by the audio buffered in the player.
+
+    A chunk is only requested while the player has less than `target_seconds` of audio queued
+    or playing ahead of the playhead, so a long text doesn't pile up audio in memory faster than
+    it is played. The buffer drains in real time, so the wait for room is known in advance.
+    Streamed chunks count with the audio downloaded so far, so streaming is paced as well.
+    """
+    MAX_WAIT = 1.0  # seconds between checks of the buffer while waiting, in case playback stalled
+
+    def __init__(self, player, target_seconds: float):
+        self.player = player
+        self.target_seconds = target_seconds
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.peak_buffered_seconds = 0.0
+        self.paused_at = None  # time.monotonic() a caller polling room_delay() started waiting
+
+    def room_delay(self) -> float:
+        """Seconds until the buffer drops below the target, 0 if there is room now"""
+        buffered = self.player.buffered_seconds()
+        self.peak_buffered_seconds = max(self.peak_buffered_seconds, buffered)
+        return max(0.0, buffered - self.target_seconds)
+
+    def pause(self) -> None:
+        """Record that a caller polling room_delay() is waiting for room"""
+        if self.paused_at is None:
+            self.paused_at = time.monotonic()
+            self.waits += 1
+
+    def resume(self) -> None:
+        """Record that a caller polling room_delay() got room"""
+        if self.paused_at is not None:
+            self.waited_seconds += time.monotonic() - self.paused_at
+            self.paused_at = None
+
+    def wait_for_room(self, cancel_token: Future | None = None) -> bool:
+        """Block until another chunk may be requested. Returns False if cancel_token was resolved meanwhile"""
+        delay = self.room_delay()
+        if delay <= 0:
+            return True
+        self.waits += 1
+        started = time.monotonic()
+        try:
+            while delay > 0:
+                if cancel_token is None:
+                    time.sleep(min(delay, self.MAX_WAIT))
+                else:
+                    wait_for_futures((cancel_token,), timeout=min(delay, self.MAX_WAIT))
+                    if cancel_token.done():
+                        return False
+                delay = self.room_delay()
+            return True
+        finally:
+            self.waited_seconds += time.monotonic() - started
+
+    async def wait_for_room_async(self) -> None:
+        """Wait on the event loop until another chunk may be requested"""
+        import asyncio
+        delay = self.room_delay()
+        if delay <= 0:
+            return
+        self.waits += 1
+        started = time.monotonic()
+        try:
+            while delay > 0:
+                await asyncio.sleep(min(delay, self.MAX_WAIT))
+                delay = self.room_delay()
+        finally:
+            self.waited_seconds += time.monotonic() - started
+
+    def display_stats(self) -> None:
+        print_colored(f"Prefetch: {self.target_seconds:g} s ahead, paused {self.waits} times for {self.waited_seconds:.1f} s, "
+                      f"at most {self.peak_buffered_seconds:.1f} s buffered", "cyan")
+
+class RequestError(Exception):
+    """
+    A failed chunk request, classified for the retry policy.
+    Args:
+        message: Description of the failure.
+        retryable: Whether the same request may succeed when sent again.
+        retry_after: Seconds the server asked to wait before the next request, if any.
+        server_fault: Whether the failure hints at a server outage, which counts towards opening the circuit breaker.
+        status: HTTP status of the response, if there was one.
+    """
+    def __init__(self, message: str, retryable: bool, retry_after: float | None = None, server_fault: bool = True,
+                 status: int | None = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.server_fault = server_fault
+        self.status = status
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header, given either in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    from datetime import datetime, timezone
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def check_audio_response(status_code: int, headers, body=lambda: "") -> None:
+    """
+    Raise a classified RequestError unless a response carries audio.
+    Rate limiting (429), request timeouts (408) and server errors (5xx) are worth retrying, other
+    client errors are not. Neither is a non-audio body with a success status, such as an HTML page
+    in place of the audio: the same request gets the same page. As the server did answer, it
+    doesn't count towards opening the circuit breaker either. `body` returns the response text,
+    it is only read for textual error messages.
+    """
+    content_type = headers.get("Content-Type")
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if status_code >= 400:
+        textual = media_type.startswith("text/") or media_type.endswith("json")
+        text = " ".join(body().split())[:200] if textual else ""
+        message = f"Request failed with HTTP {status_code}" + (f": {text}" if text else "")
+        if status_code == 429 or status_code == 503:
+            raise RequestError(message, retryable=True, retry_after=parse_retry_after(headers.get("Retry-After")),
+                               server_fault=status_code == 503, status=status_code)
+        if status_code == 408 or status_code >= 500:
+            raise RequestError(message, retryable=True, status=status_code)
+        raise RequestError(message, retryable=False, server_fault=False, status=status_code)
+    if media_type != "audio/mpeg":
+        raise RequestError(f"Unexpected response format: {content_type}", retryable=False, server_fault=False)
+
+def sleep_unless_cancelled(seconds: float, cancel_token: Future | None) -> bool:
+    """Sleep, waking up early if cancel_token is resolved. Returns False if it was"""
+    if cancel_token is None:
+        time.sleep(seconds)
+        return True
+    wait_for_futures((cancel_token,), timeout=seconds)
+    return not cancel_token.done()
+
+class RetryPolicy:
+    """
+    When to retry a failed chunk request and how long to wait first.
+
+    Delays grow exponentially from `base_delay` up to `max_delay`, with full jitter so that the
+    chunks that failed together don't all retry at the same moment. A Retry-After sent by the
+    server takes precedence, up to MAX_RETRY_AFTER.
+    """
+    MAX_RETRY_AFTER = 60.0
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.waited_seconds = 0.0
+
+    def should_retry(self, attempt: int, error: RequestError) -> bool:
+        """Whether attempt (counted from 0) failing with error is followed by another one"""
+        return error.retryable and attempt + 1 < self.max_attempts
+
+    def delay(self, attempt: int, error: RequestError) -> float:
+        """Seconds to wait after attempt (counted from 0) failed with error"""
+        if error.retry_after is not None:
+            delay = min(error.retry_after, self.MAX_RETRY_AFTER)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        self.retries += 1
+        self.waited_seconds += delay
+        return delay
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a server that keeps failing.
+
+    After `failure_threshold` consecutive server failures the circuit opens, and requests are
+    refused without contacting the server for `reset_timeout` seconds. Then a single trial request
+    is let through: if it succeeds the circuit closes, if it fails the circuit opens again. A trial
+    that never reports back, e.g. because it was flushed, is replaced after another `reset_timeout`.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0  # consecutive server failures
+        self.opened_at = 0.0  # time.monotonic() the circuit opened, or the trial request was let through
+        self.opens = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now. Counts the refused ones"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial request, 0 while the circuit is closed"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    self.opens += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+def percentile(ordered: list, fraction: float) -> float:
+    """Value below which `fraction` of the sorted, non-empty values lie"""
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class HedgePolicy:
+    """
+    Decides when a slow chunk request is sent a second time.
+
+    The latencies of the last WINDOW successful requests are kept. Once MIN_SAMPLES were measured,
+    a request still running after their 95th percentile gets a duplicate, and whichever copy answers
+    first is used. At most BUDGET of the requests are hedged, so a general slowdown of the server
+    doesn't double the load on it.
+    """
+    WINDOW = 100
+    MIN_SAMPLES = 20
+    PERCENTILE = 0.95
+    BUDGET = 0.1
+
+    def __init__(self):
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.lock = threading.Lock()
+
+    def record_latency(self, seconds: float) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def hedge_delay(self) -> float | None:
+        """Seconds after which a new request gets a duplicate, or None if it shouldn't. Counts the request"""
+        with self.lock:
+            self.requests += 1
+            if len(self.latencies) < self.MIN_SAMPLES or self.hedges >= self.BUDGET * self.requests:
+                return None
+            return percentile(sorted(self.latencies), self.PERCENTILE)
+
+    def record_hedge(self) -> None:
+        with self.lock:
+            self.hedges += 1
+
+@contextlib.contextmanager
+def locked_file(path: str):
+    """Open a file, created if missing, for reading and writing while holding an exclusive lock on it across processes"""
+    with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield fh
+            finally:
+                fh.flush()
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield fh
+            finally:
+                fh.flush()
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+class RateLimiter:
+    """
+    Token bucket limiting the rate of chunk requests sent to the server.
+
+    Tokens accrue at `requests_per_minute` up to `burst`, and every request takes one. Requests
+    waiting for a token are served by priority, then in order of arrival, so interactive speech
+    goes ahead of bulk rendering. A 429 from the server empties the bucket until its Retry-After
+    passed, which holds back every request sharing it.
+
+    All producers given the same RateLimiter share its bucket. With `state_path` the bucket is
+    kept in a file, locked while it is updated, and shared by every process using that file; an
+    interactive request waiting in one process then also holds back bulk requests of the others.
+    """
+    PRIORITY_INTERACTIVE = 0
+    PRIORITY_BULK = 1
+    MAX_WAIT = 0.1  # seconds between checks while waiting, so that cancelled requests leave the queue promptly
+
+    def __init__(self, requests_per_minute: float, burst: int = 1, state_path: str | None = None):
+        self.requests_per_minute = requests_per_minute
+        self.rate = requests_per_minute / 60
+        self.burst = max(1, burst)
+        self.state_path = state_path
+        self.state = self.new_state()
+        self.waiters = []  # heap of the (priority, arrival) tickets of requests waiting for a token
+        self.arrivals = itertools.count()
+        self.condition = threading.Condition()
+        self.requests = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.longest_wait = 0.0
+        self.throttles = 0
+
+    def new_state(self) -> dict:
+        return {"tokens": float(self.burst), "updated": time.time(), "blocked_until": 0.0, "interactive_until": 0.0}
+
+    @contextlib.contextmanager
+    def bucket(self):
+        """The bucket state to update, read from and written back to the state file if there is one"""
+        if self.state_path is None:
+            yield self.state
+            return
+        with locked_file(self.state_path) as fh:
+            try:
+                state = json.loads(fh.read() or b"{}")
+                if not all(isinstance(state.get(key), (int, float)) for key in self.state):
+                    state = self.new_state()
+            except ValueError:
+                state = self.new_state()  # Written by an older or crashed process, start over
+            yield state
+            fh.seek(0)
+            fh.write(json.dumps(state).encode("utf-8"))
+            fh.truncate()
+
+    def take_token(self, priority: int) -> float:
+        """Take a token if one is available to a request of this priority. Returns 0 if it was, else the seconds until it may be"""
+        now = time.time()
+        with self.bucket() as state:
+            state["tokens"] = min(self.burst, state["tokens"] + max(0.0, now - state["updated"]) * self.rate)
+            state["updated"] = now
+            if now < state["blocked_until"]:
+                return state["blocked_until"] - now
+            if priority > self.PRIORITY_INTERACTIVE and now < state["interactive_until"]:
+                return state["interactive_until"] - now
+            if state["tokens"] >= 1:
+                state["tokens"] -= 1
+                if priority == self.PRIORITY_INTERACTIVE:
+                    state["interactive_until"] = 0.0
+                return 0.0
+            delay = (1 - state["tokens"]) / self.rate
+            if priority == self.PRIORITY_INTERACTIVE:
+                state["interactive_until"] = now + delay + self.MAX_WAIT
+            return delay
+
+    def enqueue(self, priority: int) -> tuple:
+        with self.condition:
+            ticket = (priority, next(self.arrivals))
+            heapq.heappush(self.waiters, ticket)
+            return ticket
+
+    def dequeue(self, ticket: tuple, granted: bool, waited: float) -> None:
+        with self.condition:
+            self.waiters.remove(ticket)
+            heapq.heapify(self.waiters)
+            if granted:
+                self.requests += 1
+                if waited >= 0.001:
+                    self.waits += 1
+                    self.waited_seconds += waited
+                    self.longest_wait = max(self.longest_wait, waited)
+            self.condition.notify_all()
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, cancel_token: Future | None = None) -> bool:
+        """Block until a request may be sent. Returns False if cancel_token was resolved meanwhile"""
+        ticket = self.enqueue(priority)
+        started = time.monotonic()
+        granted = False
+        try:
+            while True:
+                with self.condition:
+                    delay = self.take_token(priority) if self.waiters[0] == ticket else self.MAX_WAIT
+                    if delay <= 0:
+                        granted = True
+                        return True
+                    self.condition.wait(min(delay, self.MAX_WAIT))
+                if cancel_token is not None and cancel_token.done():
+                    return False
+        finally:
+            self.dequeue(ticket, granted, time.monotonic() - started)
+
+    async def acquire_async(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Wait on the event loop until a request may be sent"""
+        import asyncio
+        ticket = self.enqueue(priority)
+        started = time.monotonic()
+        granted = False
+        try:
+            while True:
+                with self.condition:
+                    delay = self.take_token(priority) if self.waiters[0] == ticket else self.MAX_WAIT
+                if delay <= 0:
+                    granted = True
+                    return
+                await asyncio.sleep(min(delay, self.MAX_WAIT))
+        finally:
+            self.dequeue(ticket, granted, time.monotonic() - started)
+
+    def record_throttle(self, retry_after: float | None) -> None:
+        """Hold back all requests after the server answered 429, for its Retry-After or one token's time"""
+        now = time.time()
+        with self.condition:
+            self.throttles += 1
+            with self.bucket() as state:
+                state["tokens"] = 0.0
+                state["updated"] = now
+                state["blocked_until"] = max(state["blocked_until"], now + (retry_after if retry_after is not None else 1 / self.rate))
+
+    def display_stats(self) -> None:
+        print_colored(f"Rate limit: {self.requests_per_minute:g} requests per minute, {self.waits} of {self.requests} requests waited "
+                      f"{self.waited_seconds:.1f} s in total (longest {self.longest_wait:.1f} s), server throttled {self.throttles} times", "cyan")
+
+class ResilientRequests:
+    """
+    Retry, hedging and circuit breaker handling shared by the producers.
+
+    A producer sets up its policies with init_request_policies(), runs every chunk request through
+    with_retries() or with_retries_async(), and reports the outcome of each request it sends with
+    record_outcome().
+    """
+    def init_request_policies(self, rate_limiter: RateLimiter | None, priority: int) -> None:
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker()
+        self.hedging = HedgePolicy()
+        self.rate_limiter = rate_limiter
+        self.priority = priority
+
+    def record_outcome(self, error: RequestError | None) -> None:
+        """
+        Tell the circuit breaker how a request ended: any answer from the server but a server fault means it is up.
+        Throttling by the server holds back the requests sharing the rate limiter.
+        """
+        if error is not None and error.server_fault:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+        if error is not None and error.status == 429 and self.rate_limiter is not None:
+            self.rate_limiter.record_throttle(error.retry_after)
+
+    def allow_attempt(self, chunk_id: int) -> bool:
+        """Whether the circuit breaker lets a request for the chunk through, reporting it if not"""
+        if self.circuit_breaker.allow_request():
+            return True
+        print_colored(f"Skipping chunk {chunk_id}: the server keeps failing, requests resume in {self.circuit_breaker.retry_in():.0f} s.", "red")
+        return False
+
+    def retry_delay(self, chunk_id: int, attempt: int, error: RequestError) -> float | None:
+        """Seconds to wait before retrying the chunk after attempt (counted from 0) failed with error, or None to give up"""
+        if not self.retry_policy.should_retry(attempt, error):
+            print_colored(f"Failed to process chunk {chunk_id} after {attempt + 1} attempts.", "red")
+            return None
+        delay = self.retry_policy.delay(attempt, error)
+        print_colored(f"Retry {attempt + 1} for chunk {chunk_id} in {delay:.1f} s...", "yellow")
+        return delay
+
+    def with_retries(self, chunk_id: int, attempt_function, cancel_token: Future | None = None):
+        """
+        Call attempt_function, again after each RequestError it raises as the retry policy allows, until cancelled.
+        Returns its result, or None if the chunk was given up or cancelled.
+        """
+        attempt = 0
+        while self.allow_attempt(chunk_id):
+            try:
+                return attempt_function()
+            except RequestError as e:
+                print_colored(str(e), "red")
+                if cancel_token is not None and cancel_token.done():
+                    return None
+                delay = self.retry_delay(chunk_id, attempt, e)
+                if delay is None or not sleep_unless_cancelled(delay, cancel_token):
+                    return None
+                attempt += 1
+        return None
+
+    async def with_retries_async(self, chunk_id: int, attempt_function):
+        """with_retries() for a coroutine function, waiting on the event loop"""
+        import asyncio
+        attempt = 0
+        while self.allow_attempt(chunk_id):
+            try:
+                return await attempt_function()
+            except RequestError as e:
+                print_colored(str(e), "red")
+                delay = self.retry_delay(chunk_id, attempt, e)
+                if delay is None:
+                    return None
+                await asyncio.sleep(delay)
+                attempt += 1
+        return None
+
+    def display_request_stats(self) -> None:
+        """Report retries, hedged requests and circuit breaker trips, if there were any"""
+        if self.retry_policy.retries or self.hedging.hedges or self.circuit_breaker.opens:
+            print_colored(f"Requests: {self.retry_policy.retries} retries after {self.retry_policy.waited_seconds:.1f} s of backoff, "
+                          f"{self.hedging.hedges} hedged ({self.hedging.hedges_won} answered first by the duplicate), "
+                          f"circuit opened {self.circuit_breaker.opens} times and refused {self.circuit_breaker.rejected} requests", "cyan")
+
+SPEECHMA_URL = 'https://speechma.com/com.api/tts-api.php'
+SPEECHMA_HEADERS = {
+    'Host': 'speechma.com',
+    'Sec-Ch-Ua-Platform': 'Windows',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Sec-Ch-Ua': '"Chromium";v="131", "Not_A Brand";v="24"',
+    'Content-Type': 'application/json',
+    'Sec-Ch-Ua-Mobile': '?0',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.6778.140 Safari/537.36',
+    'Accept': '*/*',
+    'Origin': 'https://speechma.com',
+    'Sec-Fetch-Site': 'same-origin',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Dest': 'empty',
+    'Referer': 'https://speechma.com/',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Priority': 'u=1, i'
+}
+
+class TtsBackend(ABC):
+    """
+    Text to speech service the producers request audio from: where requests are sent, which
+    headers and body they carry, and which responses hold audio. Subclass it to use another service.
+    """
+    url: str
+    headers: dict = {}
+
+    @abstractmethod
+    def request_body(self, text: str, voice_id: str) -> str:
+        """Body of the POST request for the speech of a text chunk"""
+
+    def check_response(self, status_code: int, headers, body=lambda: "") -> None:
+        """Raise a RequestError unless the response holds mp3 audio. `body` returns the response text, for error messages"""
+        check_audio_response(status_code, headers, body)
+
+class SpeechmaBackend(TtsBackend):
+    """The Speechma API, called the way its web page does"""
+    url = SPEECHMA_URL
+    headers = SPEECHMA_HEADERS
+
+    def request_body(self, text: str, voice_id: str) -> str:
+        return json.dumps({"text": text, "voice": voice_id})
+
+class StubBackend(SpeechmaBackend):
+    """
+    A server speaking the Speechma API at another URL, such as benchmarks/stub_server.py, which
+    answers with synthetic audio to test and benchmark the tool offline. The browser headers
+    Speechma expects are not sent.
+    """
+    headers = {'Content-Type': 'application/json'}
+
+    def __init__(self, url: str):
+        self.url = url
+
+class RequestTimings:
+    """
+    Where the time of one request went, in seconds. The connection phases are None when a
+    kept-alive connection was reused; both engines report name resolution as part of connect.
+    """
+    def __init__(self):
+        self.connect = None
+        self.tls = None
+        self.ttfb = None  # from sending the request to its response headers, without the connection phases
+        self.download = None  # from the response headers to the end of the body
+
+    def connection_seconds(self) -> float:
+        return sum(phase for phase in (self.connect, self.tls) if phase is not None)
+
+class TransportStats:
+    """Timings per phase of the requests sent through a transport"""
+    WINDOW = 1000  # requests whose timings are kept for the percentiles
+    PHASES = (("connect", "connect"), ("tls", "TLS"), ("ttfb", "first byte"), ("download", "download"))
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.samples = {phase: deque(maxlen=self.WINDOW) for phase, _ in self.PHASES}
+        self.lock = threading.Lock()
+
+    def record(self, timings: RequestTimings) -> None:
+        with self.lock:
+            self.requests += 1
+            if timings.connect is not None:
+                self.new_connections += 1
+            for phase, _ in self.PHASES:
+                value = getattr(timings, phase)
+                if value is not None:
+                    self.samples[phase].append(value)
+
+    def display_stats(self) -> None:
+        if not self.requests:
+            return
+        phases = []
+        for phase, label in self.PHASES:
+            ordered = sorted(self.samples[phase])
+            if ordered:
+                phases.append(f"{label} {percentile(ordered, 0.5) * 1000:.0f}/{percentile(ordered, 0.95) * 1000:.0f} ms")
+        print_colored(f"Transport: {self.requests} requests over {self.new_connections} new connections, "
+                      f"median/p95 {', '.join(phases)}", "cyan")
+
+def connection_pool_size(pool_size: int | None, concurrency: int) -> int:
+    """Connections to keep alive: pool_size if set, else one per concurrent request and one for its hedged duplicate"""
+    return pool_size if pool_size is not None else 2 * concurrency
+
+def timed_connection_pool_classes() -> dict:
+    """
+    urllib3 connection pool classes by scheme, whose connections remember how long it took to set
+    them up in `setup_timings`: (time.monotonic() the setup started, RequestTimings with connect and TLS)
+    """
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class TimedConnection:
+        setup_timings = None
+
+        def _new_conn(self):
+            start = time.monotonic()
+            sock = super()._new_conn()  # Resolves the name and connects the socket
+            timings = RequestTimings()
+            timings.connect = time.monotonic() - start
+            self.setup_timings = (start, timings)
+            return sock
+
+    class TimedHTTPConnection(TimedConnection, HTTPConnection):
+        pass
+
+    class TimedHTTPSConnection(TimedConnection, HTTPSConnection):
+        def connect(self):
+            super().connect()
+            if self.setup_timings is not None:
+                start, timings = self.setup_timings
+                timings.tls = max(0.0, time.monotonic() - start - timings.connect)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+class HttpTransport:
+    """
+    Keep-alive HTTP connections to the server, shared by all producers given the same transport.
+
+    Up to `pool_size` idle connections are kept for reuse. A request fails with a timeout when no
+    connection was established after `connect_timeout` seconds, or no data arrived for
+    `read_timeout` seconds, so a stalled socket never hangs a producer. prewarm() resolves the
+    server's name and opens connections ahead of the first request. The connect, TLS, time to
+    first byte and download times of every request are recorded in `stats`; the connections of the
+    adapter's pools time their own setup.
+    """
+    def __init__(self, pool_size: int, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT):
+        import requests  # Deferred, it is the slowest import of the tool
+        import urllib3
+
         self.session = requests.Session()
+        self.adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(1, pool_size))
+        self.adapter.poolmanager.pool_classes_by_scheme = timed_connection_pool_classes()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.pool_size = max(1, pool_size)
+        self.timeout = urllib3.Timeout(connect=connect_timeout, read=read_timeout)
+        self.stats = TransportStats()
+
+    @contextlib.contextmanager
+    def post(self, url: str, body: str, headers: dict | None = None):
+        """Send a POST request. Yields the response once its headers arrived; the body is read in the with block"""
+        timings = RequestTimings()
+        start = time.monotonic()
+        response = self.session.post(url, data=body, headers=headers, stream=True, timeout=self.timeout)
+        headers_at = time.monotonic()
+        # The connection is held by the response until its body is read
+        setup_timings = getattr(getattr(response.raw, "connection", None), "setup_timings", None)
+        if setup_timings is not None and setup_timings[0] >= start:  # Opened for this request, not reused
+            timings.connect, timings.tls = setup_timings[1].connect, setup_timings[1].tls
+        timings.ttfb = headers_at - start - timings.connection_seconds()
+        try:
+            with response:
+                yield response
+        finally:
+            timings.download = time.monotonic() - headers_at
+            self.stats.record(timings)
+
+    def prewarm(self, url: str, connections: int = 1, headers: dict | None = None) -> None:
+        """Resolve the server's name and open keep-alive connections to it in the background, ahead of the first request"""
+        import socket
+
+        origin = url.split("/", 3)
+        host = origin[2].rsplit(":", 1)[0] if ":" in origin[2] and not origin[2].endswith("]") else origin[2]
+
+        def warm_connection():
+            try:
+                self.session.head(f"{origin[0]}//{origin[2]}/", headers=headers, timeout=(self.timeout.connect_timeout, PREWARM_TIMEOUT))
+            except Exception:
+                pass  # Only an optimization: the chunk requests report real connection problems
+
+        def warm_up():
+            try:
+                socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            except OSError:
+                return
+            # Concurrent requests each open a connection, which all stay in the pool
+            workers = [threading.Thread(target=warm_connection, daemon=True) for _ in range(min(connections, self.pool_size))]
+            for worker in workers:
+                worker.start()
+
+        threading.Thread(target=warm_up, name="http-prewarm", daemon=True).start()
+
+    def display_stats(self) -> None:
+        self.stats.display_stats()
+
+class AsyncHttpTransport:
+    """
+    HttpTransport for the async engine, on httpx: a connection pool of `pool_size`, connect and read
+    timeouts, and optionally HTTP/2, which multiplexes all requests over one connection. Must be
+    created on the event loop it is used from.
+    """
+    def __init__(self, pool_size: int, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 http2: bool = False):
+        import httpx
+
+        self.pool_size = max(1, pool_size)
+        self.http2 = http2
+        self.client = httpx.AsyncClient(http2=http2,
+                                        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                                        limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size))
+        self.stats = TransportStats()
+
+    @contextlib.asynccontextmanager
+    async def post(self, url: str, body: str, headers: dict | None = None):
+        """Send a POST request. Yields the response once its headers arrived; the body is read in the with block"""
+        timings = RequestTimings()
+        phase_started = {}
+
+        async def trace(event: str, info: dict) -> None:
+            # httpcore resolves the name while connecting, and reports both phases as connect_tcp
+            phase, _, state = event.rpartition(".")
+            if state == "started":
+                phase_started[phase] = time.monotonic()
+            elif state == "complete" and phase in phase_started:
+                if phase == "connection.connect_tcp":
+                    timings.connect = time.monotonic() - phase_started[phase]
+                elif phase == "connection.start_tls":
+                    timings.tls = time.monotonic() - phase_started[phase]
+
+        start = time.monotonic()
+        request = self.client.build_request("POST", url, content=body, headers=headers, extensions={"trace": trace})
+        response = await self.client.send(request, stream=True)
+        headers_at = time.monotonic()
+        timings.ttfb = max(0.0, headers_at - start - timings.connection_seconds())
+        try:
+            yield response
+        finally:
+            await response.aclose()
+            timings.download = time.monotonic() - headers_at
+            self.stats.record(timings)
+
+    async def prewarm(self, url: str, connections: int = 1, headers: dict | None = None) -> None:
+        """Open keep-alive connections to the server ahead of the first request"""
+        import asyncio
+        origin = url.split("/", 3)
+
+        async def warm_connection():
+            try:
+                await self.client.head(f"{origin[0]}//{origin[2]}/", headers=headers, timeout=PREWARM_TIMEOUT)
+            except Exception:
+                pass  # Only an optimization: the chunk requests report real connection problems
+
+        # A single HTTP/2 connection carries all requests
+        await asyncio.gather(*(warm_connection() for _ in range(1 if self.http2 else min(connections, self.pool_size))))
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def display_stats(self) -> None:
+        self.stats.display_stats()
+
+class TtsProducer(ResilientRequests):
+    """
+    Text to speech producer that obtains mp3 in a separate thread and passes them to a consumer.
+
+    Up to `concurrency` chunks of a text are requested at once; the resulting mp3 data is still
+    handed to the next consumer in chunk order. In streaming mode each chunk is handed over as
+    an AudioStream as soon as its request starts, so playback can begin before it is downloaded.
+
+    With `prefetch_seconds`, chunks are only requested while the next consumer has less audio
+    than that buffered (see PrefetchScheduler). At most MAX_PENDING_TEXTS texts wait in the
+    queue; put() blocks while it is full.
+
+    flush() preempts the producer: every flush starts a new epoch, and work of older epochs is
+    abandoned. Their pending texts are dropped, waits on their requests return at once, retries
+    and streamed downloads stop, and no more of their audio is handed over.
+
+    Failed requests are retried according to a RetryPolicy, requests slower than usual are hedged
+    with a duplicate (see HedgePolicy), and a CircuitBreaker stops all requests while the server
+    keeps failing. Chunks that can't be obtained are skipped. With a `rate_limiter`, every request
+    waits for a token, at the producer's `priority`. Requests go through `transport`, which can be
+    shared with other producers to reuse its connections; by default each producer has its own.
+    They are sent to `backend`, Speechma by default. Inline voice switches are checked with
+    `is_valid_voice` (e.g. VoiceManager.is_valid_voice), if given.
+    """
+    def __init__(self, voice_id, nextConsumer, concurrency: int = 1, cache: AudioCache | None = None, streaming: bool = False,
+                 adaptive_chunking: bool = False, prefetch_seconds: float = 0, rate_limiter: RateLimiter | None = None,
+                 priority: int = RateLimiter.PRIORITY_INTERACTIVE, transport: HttpTransport | None = None,
+                 backend: TtsBackend | None = None, is_valid_voice=None):
+        self.init_fetching(voice_id, nextConsumer, concurrency, cache, prefetch_seconds, rate_limiter, priority, transport, backend,
+                           is_valid_voice)
+        self.streaming = streaming
+        self.chunk_sizer = AdaptiveChunkSizer(FIRST_CHUNK_SIZE, MAX_CHUNK_SIZE, player=nextConsumer) if adaptive_chunking else None
+        self.text_queue = queue.Queue(maxsize=MAX_PENDING_TEXTS)
+        self.start_consumer_thread()
+
+    def init_fetching(self, voice_id, nextConsumer, concurrency: int, cache: AudioCache | None, prefetch_seconds: float,
+                      rate_limiter: RateLimiter | None, priority: int, transport: HttpTransport | None, backend: TtsBackend | None,
+                      is_valid_voice) -> None:
+        """Set up the request machinery shared with TtsProducerPool: executors, request policies, transport and flush state"""
         self.nextConsumer = nextConsumer
         self.voice_id = voice_id
-        self.url = 'https://speechma.com/com.api/tts-api.php'
-        self.session.headers = {
-            'Host': 'speechma.com',
-            'Sec-Ch-Ua-Platform': 'Windows',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Sec-Ch-Ua': '"Chromium";v="131", "Not_A Brand";v="24"',
-            'Content-Type': 'application/json',
-            'Sec-Ch-Ua-Mobile': '?0',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.6778.140 Safari/537.36',
-            'Accept': '*/*',
-            'Origin': 'https://speechma.com',
-            'Sec-Fetch-Site': 'same-origin',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Dest': 'empty',
-            'Referer': 'https://speechma.com/',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Priority': 'u=1, i'
-        }
-        self.text_queue = queue.Queue()
+        self.is_valid_voice = is_valid_voice
+        self.cache = cache
+        self.prefetch_seconds = prefetch_seconds
+        self.prefetch = self.make_prefetch_scheduler(nextConsumer)
+        self.concurrency = max(1, concurrency)
+        self.fetch_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="tts-fetch")
+        self.fetches = set()  # fetches submitted and not finished yet
+        # Requests that may be hedged run here, so the fetch worker can send a duplicate while waiting
+        self.request_executor = ThreadPoolExecutor(max_workers=2 * self.concurrency, thread_name_prefix="tts-request")
+        self.init_request_policies(rate_limiter, priority)
+        # Keep one pooled connection per worker, and one for its hedged request, so concurrent chunks don't fight over sockets
+        self.transport = transport if transport is not None else HttpTransport(2 * self.concurrency)
+        self.backend = backend if backend is not None else SpeechmaBackend()
+        self.dropped_texts = 0
+        self.flush_lock = threading.Lock()  # makes epoch changes atomic with putting texts and submitting requests
+        self.handover_lock = threading.Lock()  # makes flushing the next consumer atomic with handing audio over
+        self.epoch = 0
+        self.cancel_token = Future()  # resolved when the current epoch is flushed
+        self.flushes = 0
+
+    def start_consumer_thread(self) -> None:
         self.consumer_thread = threading.Thread(target=self.text_consumer)
         self.consumer_thread.daemon = True  # Allows thread to exit when the main program does
         self.consumer_thread.start()
 
+    def make_prefetch_scheduler(self, consumer) -> PrefetchScheduler | None:
+        """Pace requests for consumers that report their buffered audio, if prefetching is limited"""
+        if self.prefetch_seconds and hasattr(consumer, "buffered_seconds"):
+            return PrefetchScheduler(consumer, self.prefetch_seconds)
+        return None
+
+    @staticmethod
+    def request_error(error: Exception) -> RequestError:
+        """Classify an exception raised by requests"""
+        import requests
+
+        if isinstance(error, requests.exceptions.Timeout):
+            return RequestError(f"Request timed out: {error}", retryable=True)
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                              requests.exceptions.ContentDecodingError)):
+            return RequestError(f"Connection failed: {error}", retryable=True)
+        if isinstance(error, requests.exceptions.RequestException):
+            return RequestError(f"Request failed: {error}", retryable=False, server_fault=False)
+        return RequestError(f"An unexpected error occurred: {error}", retryable=False, server_fault=False)
+
+    def get_audio(self, data, cancel_token: Future | None = None) -> bytes | None:
+        """
+        Function to get audio from the server, until it is cancelled.
+        Returns None if it was cancelled, raises a RequestError if it fails.
+        """
+        try:
+            with self.transport.post(self.backend.url, self.backend.request_body(data["text"], data["voice"]), self.backend.headers) as response:
+                self.backend.check_response(response.status_code, response.headers, lambda: response.text)
+                pieces = []
+                for piece in response.iter_content(chunk_size=STREAM_READ_SIZE):
+                    if cancel_token is not None and cancel_token.done():
+                        return None  # Closing the response drops the connection
+                    pieces.append(piece)
+                return b"".join(pieces)
+        except RequestError:
+            raise
+        except Exception as e:
+            raise self.request_error(e) from e
+
+    def stream_audio(self, data, audio_stream: AudioStream, cancel_token: Future | None = None) -> bool:
+        """
+        Function to stream audio from the server into an AudioStream as it is received, until it is cancelled.
+        Returns False if it was cancelled, raises a RequestError if it fails.
+        """
+        try:
+            with self.transport.post(self.backend.url, self.backend.request_body(data["text"], data["voice"]), self.backend.headers) as response:
+                self.backend.check_response(response.status_code, response.headers, lambda: response.text)
+                for piece in response.iter_content(chunk_size=STREAM_READ_SIZE):
+                    if cancel_token is not None and cancel_token.done():
+                        return False  # Closing the response drops the connection
+                    audio_stream.write(piece)
+            return True
+        except RequestError:
+            raise
+        except Exception as e:
+            raise self.request_error(e) from e
+
+    def send_request(self, data, cancel_token: Future | None = None) -> bytes | None:
+        """Send one request once the rate limiter allows it, recording its outcome and latency. Returns None once cancelled"""
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(self.priority, cancel_token):
+            return None
+        start = time.monotonic()
+        try:
+            mp3_data = self.get_audio(data, cancel_token)
+        except RequestError as e:
+            self.record_outcome(e)
+            raise
+        if mp3_data is None:
+            return None  # Cancelled, neither a success nor a failure
+        self.record_outcome(None)
+        self.hedging.record_latency(time.monotonic() - start)
+        return mp3_data
+
+    def get_audio_hedged(self, data, chunk_id: int, cancel_token: Future | None = None) -> bytes | None:
+        """
+        Send a request, and a duplicate if it is still running when the hedging policy says so.
+        Returns the first audio received, or None once cancelled. Raises the last RequestError if all copies fail.
+        """
+        hedge_delay = self.hedging.hedge_delay()
+        if hedge_delay is None:
+            return self.send_request(data, cancel_token)
+
+        first = self.request_executor.submit(self.send_request, data, cancel_token)
+        cancel = () if cancel_token is None else (cancel_token,)
+        wait_for_futures((first, *cancel), timeout=hedge_delay, return_when=FIRST_COMPLETED)
+        if cancel_token is not None and cancel_token.done():
+            return None
+        if first.done() or not self.circuit_breaker.allow_request():
+            wait_for_futures((first, *cancel), return_when=FIRST_COMPLETED)
+            return first.result() if first.done() else None
+
+        self.hedging.record_hedge()
+        print_colored(f"Chunk {chunk_id} is taking longer than {hedge_delay:.1f} s, requesting it again...", "yellow")
+        hedge = self.request_executor.submit(self.send_request, data, cancel_token)
+        requests = {first, hedge}
+        error = None
+        while requests:
+            done, _ = wait_for_futures((*requests, *cancel), return_when=FIRST_COMPLETED)
+            if cancel_token is not None and cancel_token.done():
+                return None
+            for future in done:
+                requests.discard(future)
+                try:
+                    mp3_data = future.result()
+                except RequestError as e:
+                    error = e
+                    continue
+                if future is hedge and mp3_data is not None:
+                    self.hedging.hedges_won += 1
+                return mp3_data  # The other copy completes in the background
+        raise error
+
+    def fetch_chunk(self, data, chunk_id: int, chunk_sizer: AdaptiveChunkSizer | None = None, cancel_token: Future | None = None):
+        """Requests a chunk from the server and stores the result in the audio cache"""
+        request_start = time.monotonic()
+        mp3_data = self.with_retries(chunk_id, lambda: self.get_audio_hedged(data, chunk_id, cancel_token), cancel_token)
+        if mp3_data and chunk_sizer is not None:
+            chunk_sizer.record_request(len(data["text"]), time.monotonic() - request_start)
+        if mp3_data and self.cache is not None:
+            self.cache.put(data["voice"], data["text"], mp3_data)
+        return mp3_data
+
+    def fetch_chunk_streaming(self, data, chunk_id: int, audio_stream: AudioStream, chunk_sizer: AdaptiveChunkSizer | None = None,
+                              cancel_token: Future | None = None):
+        """Streams a chunk from the server, retrying only while nothing has been received yet"""
+        def stream_attempt() -> bool:
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(self.priority, cancel_token):
+                return False
+            try:
+                if not self.stream_audio(data, audio_stream, cancel_token):
+                    return False  # Cancelled
+            except RequestError as e:
+                self.record_outcome(e)
+                if not audio_stream.received:
+                    raise
+                print_colored(str(e), "red")
+                print_colored(f"Chunk {chunk_id} was cut short, playing the audio received so far.", "red")
+                return False
+            self.record_outcome(None)
+            return True
+
+        request_start = time.monotonic()
+        if not self.with_retries(chunk_id, stream_attempt, cancel_token):
+            audio_stream.finish(complete=False)
+            return
+        if self.cache is not None:
+            self.cache.put(data["voice"], data["text"], bytes(audio_stream.received))
+        # The player may release the stream's data once it has seen the end
+        audio_stream.finish(complete=True)
+        if chunk_sizer is not None:
+            chunk_sizer.record_request(len(data["text"]), time.monotonic() - request_start)
+
+    def get_cached_chunk(self, data, chunk_id: int) -> bytes | None:
+        """Returns the cached audio for a chunk, if any"""
+        cached = self.cache.get(data["voice"], data["text"]) if self.cache is not None else None
+        if cached:
+            print_colored(f"Using cached audio for chunk {chunk_id}", "yellow")
+        return cached
+
+    def submit_fetch(self, cancel_token: Future, function, *args) -> Future:
+        """Submit a request to the fetch executor, unless its epoch was flushed"""
+        with self.flush_lock:
+            if cancel_token.done():
+                future = Future()
+                future.set_result(None)
+                return future
+            future = self.fetch_executor.submit(function, *args)
+            self.fetches.add(future)
+        future.add_done_callback(self.fetches.discard)
+        return future
+
+    @staticmethod
+    def wait_for_chunk(future: Future, cancel_token: Future):
+        """Wait for a chunk request. Returns its result, or None as soon as its epoch is flushed"""
+        wait_for_futures((future, cancel_token), return_when=FIRST_COMPLETED)
+        if cancel_token.done():
+            return None
+        return future.result()
+
+    def get_mp3_data_chunks(self, text_data, voice_id: str, cancel_token: Future):
+        """Obtains mp3 data from Speechma, until cancel_token is resolved"""
+        if self.chunk_sizer is not None:
+            self.chunk_sizer.start_text()
+            chunks = iter_voice_chunks(text_data, voice_id, self.chunk_sizer.next_chunk_size, self.is_valid_voice)
+        else:
+            chunks = iter_voice_chunks(text_data, voice_id, lambda: MAX_CHUNK_SIZE, self.is_valid_voice)
+
+        # Chunks are fetched concurrently, but yielded strictly in order from one window of
+        # requests: cached audio, downloaded audio and streams alike are only yielded once they
+        # reach the head of the window, and only leave it once yielded and finished. The oldest
+        # request is always the one waited on, later ones keep downloading in the meantime.
+        window = deque()  # (future, AudioStream or None) of every chunk not yet handed over or still downloading
+        handed_over = 0  # number of chunks at the head of the window that were yielded
+
+        def advance(limit: int):
+            """Yield the chunks at the head of the window that are ready, waiting for the oldest until fewer than limit remain"""
+            nonlocal handed_over
+            while True:
+                while handed_over < len(window):
+                    future, audio_stream = window[handed_over]
+                    if audio_stream is None and not future.done():
+                        break
+                    handed_over += 1
+                    if audio_stream is not None:
+                        yield audio_stream  # Played while it downloads
+                    else:
+                        mp3_data = future.result()
+                        if mp3_data is not None:
+                            yield mp3_data
+                while handed_over and window[0][0].done():
+                    window.popleft()
+                    handed_over -= 1
+                if len(window) < limit or cancel_token.done():
+                    return
+                self.wait_for_chunk(window[0][0], cancel_token)
+
+        for i, (chunk_voice_id, chunk) in enumerate(chunks, start=1):
+            if self.prefetch is not None and not self.prefetch.wait_for_room(cancel_token):
+                return
+            if cancel_token.done():
+                return
+            print_colored(f"\nProcessing chunk {i}...", "yellow")
+            data = {
+                "text": chunk,
+                "voice": chunk_voice_id
+            }
+
+            cached = self.get_cached_chunk(data, i)
+            if cached:
+                future = Future()
+                future.set_result(cached)
+                window.append((future, None))
+            elif self.streaming:
+                # The future only bounds the downloads in flight, the audio goes through the stream
+                audio_stream = AudioStream()
+                window.append((self.submit_fetch(cancel_token, self.fetch_chunk_streaming, data, i, audio_stream, self.chunk_sizer, cancel_token),
+                               audio_stream))
+            else:
+                window.append((self.submit_fetch(cancel_token, self.fetch_chunk, data, i, self.chunk_sizer, cancel_token), None))
+            yield from advance(self.concurrency)
+            if cancel_token.done():
+                return
+
+        yield from advance(1)
+
     def text_consumer(self):
         """Consume text data from the queue, generate mp3 and pass it next consumer."""
-
-        def get_audio(url: str, data) -> bytes | None:
-            """Function to get audio from the server"""
+        while True:
             try:
-                json_data = json.dumps(data)
-                response = self.session.post(url, data=json_data)
-                response.raise_for_status()
-                if response.headers.get('Content-Type') == 'audio/mpeg':
-                    return response.content
-                else:
-                    print_colored(f"Unexpected response format: {response.headers.get('Content-Type')}", "red")
-                    return None
-            except requests.exceptions.RequestException as e:
-                if e.response:
-                    print_colored(f"Server response: {e.response.text}", "red")
-                print_colored(f"Request failed: {e}", "red")
-                return None
+                item = self.text_queue.get()
+                if item is None:  # Exit signal
+                    break
+                text, submitted_at, voice_id, epoch = item
+                with self.flush_lock:
+                    if epoch != self.epoch:
+                        continue  # Put before a flush that didn't drain it in time
+                    cancel_token = self.cancel_token
+                for mp3_data in self.get_mp3_data_chunks(text, voice_id, cancel_token):
+                    with self.handover_lock:
+                        if cancel_token.done():
+                            break
+                        # Only the first audio of a text carries the time it was submitted
+                        self.nextConsumer.put(mp3_data, started_at=submitted_at)
+                    submitted_at = None
             except Exception as e:
-                print_colored(f"An unexpected error occurred: {e}", "red")
-                return None
+                print_colored(f"Exception while processing TTS data: {e}", "red")
+            finally:
+                self.text_queue.task_done()
 
-        def split_text(text: str, chunk_size: int = 1000):
-            """Function to split text into chunks"""
-            if not text:
-                print_colored("Error: No text provided to split.", "red")
-                return []
+    def prewarm(self) -> None:
+        """Open a keep-alive connection per concurrent request to the server in the background, ahead of the first chunk request"""
+        self.transport.prewarm(self.backend.url, self.concurrency, self.backend.headers)
 
-            chunks = []
-            while len(text) > 0:
-                if len(text) <= chunk_size:
-                    chunks.append(text)
-                    break
-                chunk = text[:chunk_size]
-                last_full_stop = chunk.rfind('.')
-                last_comma = chunk.rfind(',')
-                split_index = last_full_stop if last_full_stop != -1 else last_comma
-                if split_index == -1:
-                    split_index = chunk_size
-                else:
-                    split_index += 1
-                chunks.append(text[:split_index])
-                text = text[split_index:].lstrip()
-            return chunks
-
-        def validate_text(text: str):
-            """Function to validate text"""
-            return ''.join(char for char in text if ord(char) < 128)
-        
-        def attempt_get_audio(data, chunk_id: int, max_retries: int = 3):
-            """Attempts to get audio data with retries"""
-            for retry in range(max_retries):
-                response = get_audio(self.url, data)
-                if response:
-                    return response
-
-                print_colored(f"Retry {retry + 1} for chunk {chunk_id}...", "yellow")
+    def put(self, text_data, submitted_at: float | None = None, voice_id: str | None = None):
+        """
+        Add text data to the queue for playback.
+        Args:
+            text_data: Text to speak. It may switch voices with [voice-XXX] markup.
+            submitted_at: time.monotonic() timestamp the text became available, used to measure
+                the time to first sound. Defaults to now.
+            voice_id: Voice to use for this text instead of the producer's voice.
+        Blocks while MAX_PENDING_TEXTS texts are waiting to be synthesized.
+        """
+        with self.flush_lock:
+            epoch = self.epoch
+        # Outside the lock, as it blocks while the queue is full
+        self.text_queue.put((text_data, time.monotonic() if submitted_at is None else submitted_at, voice_id or self.voice_id, epoch))
+
+    def drop_pending(self) -> int:
+        """Drop the texts that were put but whose synthesis hasn't started. Returns their number"""
+        dropped = 0
+        while True:
+            try:
+                item = self.text_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:  # Keep the exit signal
+                self.text_queue.task_done()
+                self.text_queue.put(None)
+                break
+            dropped += 1
+            self.text_queue.task_done()
+        self.dropped_texts += dropped
+        return dropped
+
+    def flush(self) -> None:
+        """
+        Stop speaking: abandon the text being synthesized and all pending texts, and flush the next
+        consumer. Requests in flight are aborted as soon as their audio starts to arrive. As a
+        request still waiting for the server's response can't be interrupted, texts put afterwards
+        are synthesized on fresh worker threads if any are, so they don't wait behind them.
+        """
+        with self.flush_lock:
+            self.epoch += 1
+            self.cancel_token.set_result(None)
+            self.cancel_token = Future()
+            abandoned_executors = ()
+            if any(not fetch.done() for fetch in list(self.fetches)):
+                abandoned_executors = (self.fetch_executor, self.request_executor)
+                self.fetch_executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="tts-fetch")
+                self.request_executor = ThreadPoolExecutor(max_workers=2 * self.concurrency, thread_name_prefix="tts-request")
+        for abandoned_executor in abandoned_executors:
+            abandoned_executor.shutdown(wait=False, cancel_futures=True)
+        self.drop_pending()
+        self.flushes += 1
+        # A hand-over already under way finishes before the flush, the ones after it see the cancelled token
+        with self.handover_lock:
+            if hasattr(self.nextConsumer, "flush"):
+                self.nextConsumer.flush()
+
+    def wait_for_completion(self):
+        """Wait until all text_data is processed and the next consumer is ready"""
+        self.text_queue.join()
+        self.text_queue.put(None)  # Signal the consumer to exit
+        self.consumer_thread.join()  # Wait for consumer thread to finish
+        self.fetch_executor.shutdown(wait=True)
+        self.request_executor.shutdown(wait=False)  # Only the losers of hedged requests may still run
+        if self.cache is not None:
+            self.cache.save_index()
+        if self.nextConsumer is not None:
+            self.nextConsumer.wait_for_completion()
+
+# Marks the end of a text in the delivery order of a TtsProducerPool stream
+END_OF_TEXT = object()
+
+class ProducerStream:
+    """Pending texts and in-order delivery state of one output stream of a TtsProducerPool"""
+    def __init__(self, name: str, consumer, chunk_sizer: AdaptiveChunkSizer | None, prefetch: PrefetchScheduler | None = None,
+                 is_valid_voice=None):
+        self.name = name
+        self.consumer = consumer
+        self.chunk_sizer = chunk_sizer
+        self.prefetch = prefetch
+        self.is_valid_voice = is_valid_voice
+        self.texts = deque()  # (text, submitted_at, voice_id) not started yet
+        self.chunks = None  # iterator over the (voice_id, chunk) pairs of the current text
+        self.submitted_at = None  # submission time of the current text, until its first chunk is scheduled
+        self.chunk_count = 0
+        self.next_sequence = 0  # sequence number of the next scheduled chunk
+        self.next_delivery = 0  # sequence number of the next chunk to hand to the consumer
+        self.results = {}  # sequence -> (mp3_data, cancel_token, started_at) waiting for earlier chunks
+        self.outstanding = 0  # chunks scheduled but not handed over yet
+        self.lock = threading.Lock()
+
+    def next_chunk(self):
+        """
+        Return the next (voice_id, chunk, started_at) to request, or None if the stream has no pending text.
+        After the last chunk of each text the chunk is END_OF_TEXT, which is delivered without a request.
+        """
+        while True:
+            if self.chunks is not None:
+                for voice_id, chunk in self.chunks:
+                    started_at, self.submitted_at = self.submitted_at, None
+                    return voice_id, chunk, started_at
+                self.chunks = None
+                return None, END_OF_TEXT, None
+            if not self.texts:
+                return None
+            text, self.submitted_at, voice_id = self.texts.popleft()
+            if self.chunk_sizer is not None:
+                self.chunk_sizer.start_text()
+                self.chunks = iter_voice_chunks(text, voice_id, self.chunk_sizer.next_chunk_size, self.is_valid_voice)
             else:
-                print_colored(f"Failed to process chunk {chunk_id} after {max_retries} retries.", "red")
-
-        def get_mp3_data_chunks(text_data):
-            """Obtains mp3 data from Speechma"""
-            text = validate_text(text_data)     
-            chunks = split_text(text, chunk_size=1000)
-            if not chunks:
-                print_colored("\nError: Could not split text into chunks. Skipping text data {text}.", "red")
-                return
+                self.chunks = iter_voice_chunks(text, voice_id, lambda: MAX_CHUNK_SIZE, self.is_valid_voice)
 
-            for i, chunk in enumerate(chunks, start=1):
-                print_colored(f"\nProcessing chunk {i}...", "yellow")
-                data = {
-                    "text": chunk.replace("'", "").replace('"', '').replace("&", "and"),
-                    "voice": self.voice_id
-                }
+class TtsProducerPool(TtsProducer):
+    """
+    Text to speech producer for several voices and output streams sharing one HTTP session.
+
+    Texts are put with a voice and the name of a stream; each stream has its own consumer and
+    receives its audio in the order its texts were put. Chunk requests are scheduled round-robin
+    across the streams that have pending text, so a long text on one stream doesn't hold back
+    the others, and at most `concurrency` requests are in flight in total. Consumers with an
+    end_of_text() method are told when all the audio of a text was handed to them.
+
+    Streams whose consumer has `prefetch_seconds` of audio buffered are skipped until it drained,
+    and put() blocks while MAX_PENDING_TEXTS texts are waiting across all streams.
+
+    flush() abandons the texts of all streams; requests already sent keep their request slots
+    until they complete, but their audio is discarded. Chunks are handed over once downloaded,
+    there is no streaming mode.
+    """
+    DEFAULT_STREAM = "default"
+
+    def __init__(self, voice_id, nextConsumer, concurrency: int = 1, cache: AudioCache | None = None,
+                 adaptive_chunking: bool = False, prefetch_seconds: float = 0, rate_limiter: RateLimiter | None = None,
+                 priority: int = RateLimiter.PRIORITY_INTERACTIVE, transport: HttpTransport | None = None,
+                 backend: TtsBackend | None = None, is_valid_voice=None):
+        # Only the request machinery of TtsProducer is shared, the text queue is replaced by the streams
+        self.init_fetching(voice_id, nextConsumer, concurrency, cache, prefetch_seconds, rate_limiter, priority, transport, backend,
+                           is_valid_voice)
+        self.streams = OrderedDict()  # name -> ProducerStream, in round-robin order
+        self.work_changed = threading.Condition()
+        self.stopping = False
+        self.adaptive_chunking = adaptive_chunking
+        self.request_slots = threading.Semaphore(self.concurrency)
+        self.add_stream(self.DEFAULT_STREAM, nextConsumer)
+        self.start_consumer_thread()
+
+    def add_stream(self, name: str, consumer) -> None:
+        """Register an output stream and the consumer its audio is handed to"""
+        chunk_sizer = AdaptiveChunkSizer(FIRST_CHUNK_SIZE, MAX_CHUNK_SIZE, player=consumer) if self.adaptive_chunking else None
+        with self.work_changed:
+            prefetch = self.prefetch if consumer is self.nextConsumer else self.make_prefetch_scheduler(consumer)
+            self.streams[name] = ProducerStream(name, consumer, chunk_sizer, prefetch, self.is_valid_voice)
+            self.work_changed.notify_all()
+
+    def put(self, text_data, submitted_at: float | None = None, voice_id: str | None = None, stream: str = DEFAULT_STREAM):
+        """
+        Add text data to one of the streams.
+        Args:
+            text_data: Text to speak. It may switch voices with [voice-XXX] markup.
+            submitted_at: time.monotonic() timestamp the text became available. Defaults to now.
+            voice_id: Voice to use for this text instead of the producer's voice.
+            stream: Name of the stream, registered with add_stream, whose consumer receives the audio.
+        """
+        with self.work_changed:
+            if stream not in self.streams:
+                raise ValueError(f"Unknown stream '{stream}'")
+            submitted_at = time.monotonic() if submitted_at is None else submitted_at
+            while sum(len(pending.texts) for pending in self.streams.values()) >= MAX_PENDING_TEXTS:
+                self.work_changed.wait()
+            self.streams[stream].texts.append((text_data, submitted_at, voice_id or self.voice_id))
+            self.work_changed.notify_all()
+
+    def drop_pending(self) -> int:
+        """Drop the texts of all streams whose synthesis hasn't started. Returns their number"""
+        with self.work_changed:
+            dropped = sum(len(stream.texts) for stream in self.streams.values())
+            for stream in self.streams.values():
+                stream.texts.clear()
+            self.work_changed.notify_all()
+        self.dropped_texts += dropped
+        return dropped
+
+    def flush(self) -> None:
+        """Stop speaking: abandon the texts of all streams and flush each stream's consumer"""
+        with self.work_changed:
+            with self.flush_lock:
+                self.epoch += 1
+                self.cancel_token.set_result(None)
+                self.cancel_token = Future()
+            for stream in self.streams.values():
+                self.dropped_texts += len(stream.texts)
+                stream.texts.clear()
+                stream.chunks = None
+            self.work_changed.notify_all()
+        self.flushes += 1
+        with self.handover_lock:
+            for consumer in self.unique_consumers():
+                if hasattr(consumer, "flush"):
+                    consumer.flush()
+
+    def unique_consumers(self) -> list:
+        """The consumers of all streams, each once"""
+        consumers = []
+        for stream in self.streams.values():
+            if stream.consumer is not None and all(stream.consumer is not consumer for consumer in consumers):
+                consumers.append(stream.consumer)
+        return consumers
+
+    def next_job(self):
+        """
+        Pick the next chunk round-robin from the streams that have pending text and room in their
+        window and in their consumer's buffer.
+        Returns:
+            (stream, chunk) or None, and the seconds until a stream that is ahead gets room (None if none is).
+        """
+        room_delay = None
+        for _ in range(len(self.streams)):
+            name, stream = next(iter(self.streams.items()))
+            self.streams.move_to_end(name)
+            if stream.outstanding >= self.concurrency:
+                continue
+            if stream.prefetch is not None and (stream.texts or stream.chunks is not None):
+                delay = stream.prefetch.room_delay()
+                if delay > 0:
+                    stream.prefetch.pause()
+                    room_delay = delay if room_delay is None else min(room_delay, delay)
+                    continue
+                stream.prefetch.resume()
+            chunk = stream.next_chunk()
+            if chunk is not None:
+                return (stream, chunk), room_delay
+        return None, room_delay
+
+    def text_consumer(self):
+        """Schedule chunk requests across the streams until the pool is stopped and all text was scheduled."""
+        while True:
+            with self.work_changed:
+                job, room_delay = self.next_job()
+                while job is None:
+                    if self.stopping and all(not stream.texts and stream.chunks is None for stream in self.streams.values()):
+                        return
+                    # Streams that are ahead of their consumer get room as it plays, without a notification
+                    self.work_changed.wait(None if room_delay is None else min(room_delay, PrefetchScheduler.MAX_WAIT))
+                    job, room_delay = self.next_job()
+                self.work_changed.notify_all()  # A text may have been taken, making room for put()
+                stream, (voice_id, chunk, started_at) = job
+                cancel_token = self.cancel_token
+                sequence = stream.next_sequence
+                stream.next_sequence += 1
+                stream.outstanding += 1
+                if chunk is not END_OF_TEXT:
+                    stream.chunk_count += 1
+                chunk_id = stream.chunk_count
+
+            if chunk is END_OF_TEXT:
+                self.deliver(stream, sequence, END_OF_TEXT, None, cancel_token)
+                continue
+
+            print_colored(f"\nProcessing chunk {chunk_id} of stream '{stream.name}'...", "yellow")
+            data = {"text": chunk, "voice": voice_id}
+            cached = self.get_cached_chunk(data, chunk_id)
+            if cached:
+                self.deliver(stream, sequence, cached, started_at, cancel_token)
+                continue
+
+            self.request_slots.acquire()
+            future = self.submit_fetch(cancel_token, self.fetch_chunk, data, chunk_id, stream.chunk_sizer, cancel_token)
+            future.add_done_callback(lambda done, stream=stream, sequence=sequence, started_at=started_at, cancel_token=cancel_token:
+                                     self.finish_request(done, stream, sequence, started_at, cancel_token))
+
+    def finish_request(self, future: Future, stream: ProducerStream, sequence: int, started_at: float | None,
+                       cancel_token: Future) -> None:
+        self.request_slots.release()
+        try:
+            mp3_data = future.result()
+        except Exception as e:
+            print_colored(f"Exception while processing TTS data: {e}", "red")
+            mp3_data = None
+        self.deliver(stream, sequence, mp3_data, started_at, cancel_token)
+
+    def deliver(self, stream: ProducerStream, sequence: int, mp3_data: bytes | None, started_at: float | None,
+                cancel_token: Future) -> None:
+        """
+        Hand over the audio of a stream that is complete in sequence order, unless it was flushed.
+        Chunks without audio are reported to consumers that have a chunk_missing() method.
+        """
+        with stream.lock:
+            stream.results[sequence] = (mp3_data, cancel_token, started_at)
+            while stream.next_delivery in stream.results:
+                mp3_data, cancel_token, started_at = stream.results.pop(stream.next_delivery)
+                stream.next_delivery += 1
+                with self.handover_lock:
+                    if cancel_token.done():
+                        continue
+                    if mp3_data is END_OF_TEXT:
+                        if hasattr(stream.consumer, "end_of_text"):
+                            stream.consumer.end_of_text()
+                    elif mp3_data is not None:
+                        stream.consumer.put(mp3_data, started_at=started_at)
+                    elif hasattr(stream.consumer, "chunk_missing"):
+                        stream.consumer.chunk_missing()
+        with self.work_changed:
+            stream.outstanding -= 1
+            self.work_changed.notify_all()
+
+    def wait_for_completion(self):
+        """Wait until the text of all streams is processed, then for each stream's consumer"""
+        with self.work_changed:
+            self.stopping = True
+            self.work_changed.notify_all()
+        self.consumer_thread.join()
+        self.fetch_executor.shutdown(wait=True)
+        self.request_executor.shutdown(wait=False)
+        if self.cache is not None:
+            self.cache.save_index()
+        for consumer in self.unique_consumers():
+            consumer.wait_for_completion()
+
+class AsyncTtsProducer(ResilientRequests):
+    """
+    Text to speech producer running on an asyncio event loop in a background thread.
+
+    Every text put becomes a task on the loop, optionally with its own voice. All tasks share one
+    HTTP client and its connection pool, and at most `concurrency` chunk requests are in flight
+    across all of them. Audio is handed to the next consumer in the order the texts were put, and
+    in chunk order within each text, so it plugs into the same consumers as TtsProducer.
+    flush() cancels the tasks of all texts, which aborts their requests on the spot. Requests
+    are paced by the consumer's buffered audio, retried, hedged and stopped by a circuit breaker
+    like in TtsProducer; the slower copy of a hedged request is cancelled. A `rate_limiter` is
+    waited for on the loop. Requests go through an AsyncHttpTransport with `pool_size` connections
+    (two per concurrent request by default), the given timeouts and, with `http2`, HTTP/2, to
+    `backend` (Speechma by default). The audio cache and the hand-over to the next consumer block,
+    so they run in worker threads and the loop keeps serving the other requests meanwhile.
+    Inline voice switches are checked with `is_valid_voice`, if given.
+    """
+    def __init__(self, voice_id, nextConsumer, concurrency: int = 1, cache: AudioCache | None = None,
+                 adaptive_chunking: bool = False, prefetch_seconds: float = 0, rate_limiter: RateLimiter | None = None,
+                 priority: int = RateLimiter.PRIORITY_INTERACTIVE, pool_size: int | None = DEFAULT_POOL_SIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT, http2: bool = False,
+                 backend: TtsBackend | None = None, is_valid_voice=None):
+        import asyncio  # Deferred, only the async engine runs an event loop
+        import httpx  # Optional dependency, only needed for the async engine
+
+        self.nextConsumer = nextConsumer
+        self.voice_id = voice_id
+        self.is_valid_voice = is_valid_voice
+        self.cache = cache
+        self.adaptive_chunking = adaptive_chunking
+        self.prefetch = PrefetchScheduler(nextConsumer, prefetch_seconds) if prefetch_seconds and hasattr(nextConsumer, "buffered_seconds") else None
+        self.concurrency = max(1, concurrency)
+        self.backend = backend if backend is not None else SpeechmaBackend()
+        self.init_request_policies(rate_limiter, priority)
+        self.pending = []  # concurrent.futures.Future of every text put and not finished yet
+        self.generation = 0  # incremented by drop_pending; texts put in an older generation are skipped
+        self.texts_put = 0
+        self.texts_started = 0
+        self.dropped_texts = 0
+        self.flushes = 0
+        self.epoch = 0  # incremented by flush(); audio of older epochs is not handed over
+        self.handover_lock = threading.Lock()  # makes flushing the next consumer atomic with handing audio over
+        self.last_requested = None  # asyncio.Future resolved once the latest text requested all its chunks
+        self.last_delivery = None  # asyncio.Future resolved once the latest text was handed over
+
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name="tts-async")
+        self.loop_thread.daemon = True  # Allows thread to exit when the main program does
+        self.loop_thread.start()
+
+        async def create_transport():
+            self.request_slots = asyncio.Semaphore(self.concurrency)
+            transport_size = connection_pool_size(pool_size, self.concurrency)
+            if http2:
+                try:
+                    return AsyncHttpTransport(transport_size, connect_timeout, read_timeout, http2=True)
+                except ImportError:
+                    print_colored("HTTP/2 requires the h2 package (pip install httpx[http2]). Using HTTP/1.1.", "yellow")
+            return AsyncHttpTransport(transport_size, connect_timeout, read_timeout)
+
+        self.transport = asyncio.run_coroutine_threadsafe(create_transport(), self.loop).result()
+
+    async def get_audio(self, data) -> bytes:
+        """Function to get audio from the server. Raises a RequestError if it fails"""
+        import httpx
+
+        try:
+            async with self.transport.post(self.backend.url, self.backend.request_body(data["text"], data["voice"]), self.backend.headers) as response:
+                await response.aread()
+                self.backend.check_response(response.status_code, response.headers, lambda: response.text)
+                return response.content
+        except RequestError:
+            raise
+        except httpx.TimeoutException as e:
+            raise RequestError(f"Request timed out: {e}", retryable=True) from e
+        except httpx.TransportError as e:
+            raise RequestError(f"Connection failed: {e}", retryable=True) from e
+        except httpx.HTTPError as e:
+            raise RequestError(f"Request failed: {e}", retryable=False, server_fault=False) from e
+        except Exception as e:
+            raise RequestError(f"An unexpected error occurred: {e}", retryable=False, server_fault=False) from e
+
+    async def send_request(self, data, hedge: bool = False) -> bytes:
+        """
+        Send one request once a request slot is free and the rate limiter allows it, recording its outcome and latency.
+        The duplicate of a hedged request doesn't wait for a slot, the slow copy still holds one.
+        """
+        async with contextlib.nullcontext() if hedge else self.request_slots:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(self.priority)
+            start = time.monotonic()
+            try:
+                mp3_data = await self.get_audio(data)
+            except RequestError as e:
+                self.record_outcome(e)
+                raise
+        self.record_outcome(None)
+        self.hedging.record_latency(time.monotonic() - start)
+        return mp3_data
+
+    async def get_audio_hedged(self, data, chunk_id: int) -> bytes:
+        """
+        Send a request, and a duplicate if it is still running when the hedging policy says so.
+        Returns the first audio received, the other copy is cancelled. Raises the last RequestError if all copies fail.
+        """
+        import asyncio
+        hedge_delay = self.hedging.hedge_delay()
+        if hedge_delay is None:
+            return await self.send_request(data)
+
+        requests = {asyncio.ensure_future(self.send_request(data))}
+        try:
+            done, _ = await asyncio.wait(requests, timeout=hedge_delay)
+            if done or not self.circuit_breaker.allow_request():
+                return await requests.pop()
+
+            self.hedging.record_hedge()
+            print_colored(f"Chunk {chunk_id} is taking longer than {hedge_delay:.1f} s, requesting it again...", "yellow")
+            hedge = asyncio.ensure_future(self.send_request(data, hedge=True))
+            requests.add(hedge)
+            error = None
+            while requests:
+                done, requests = await asyncio.wait(requests, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        mp3_data = task.result()
+                    except RequestError as e:
+                        error = e
+                        continue
+                    if task is hedge:
+                        self.hedging.hedges_won += 1
+                    return mp3_data
+            raise error
+        finally:
+            for task in requests:
+                task.cancel()
+
+    async def fetch_chunk(self, data, chunk_id: int, chunk_sizer: AdaptiveChunkSizer | None) -> bytes | None:
+        """Requests a chunk, retrying as the retry policy allows, from the audio cache if possible"""
+        import asyncio
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, data["voice"], data["text"])
+            if cached:
+                print_colored(f"Using cached audio for chunk {chunk_id}", "yellow")
+                return cached
+
+        request_start = time.monotonic()
+        mp3_data = await self.with_retries_async(chunk_id, lambda: self.get_audio_hedged(data, chunk_id))
+        if mp3_data is None:
+            return None
+        if chunk_sizer is not None:
+            chunk_sizer.record_request(len(data["text"]), time.monotonic() - request_start)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, data["voice"], data["text"], mp3_data)
+        return mp3_data
+
+    def hand_over(self, mp3_data, started_at: float | None, epoch: int) -> None:
+        """Put audio in the next consumer from a worker thread, unless the producer was flushed since `epoch`"""
+        with self.handover_lock:
+            if epoch == self.epoch:
+                self.nextConsumer.put(mp3_data, started_at=started_at)
+
+    async def speak(self, text_data: str, voice_id: str, submitted_at: float, generation: int) -> None:
+        """Synthesize one text and hand its audio over once all earlier texts were handed over"""
+        import asyncio
+        # Claim this text's place in the request and delivery order before the first await
+        previous_requested = self.last_requested
+        requested = self.loop.create_future()
+        self.last_requested = requested
+        previous_delivery = self.last_delivery
+        delivery = self.loop.create_future()
+        self.last_delivery = delivery
+        epoch = self.epoch
+
+        async def deliver(mp3_data):
+            nonlocal previous_delivery, submitted_at
+            if previous_delivery is not None:
+                # Shielded: cancelling this task by a flush must not cancel the previous text's delivery
+                await asyncio.shield(previous_delivery)
+                previous_delivery = None
+            if mp3_data is not None:
+                await asyncio.to_thread(self.hand_over, mp3_data, submitted_at, epoch)
+                submitted_at = None
+
+        try:
+            # A text starts once the previous one requested all its chunks, so texts dropped while waiting cost nothing
+            if previous_requested is not None:
+                await asyncio.shield(previous_requested)
+            if generation != self.generation:
+                return
+            self.texts_started += 1
 
-                yield attempt_get_audio(data, i, max_retries = 3)
+            chunk_sizer = AdaptiveChunkSizer(FIRST_CHUNK_SIZE, MAX_CHUNK_SIZE, player=self.nextConsumer) if self.adaptive_chunking else None
+            chunks = iter_voice_chunks(text_data, voice_id, chunk_sizer.next_chunk_size if chunk_sizer is not None else lambda: MAX_CHUNK_SIZE,
+                                       self.is_valid_voice)
 
-        while True:
+            # Same bounded, in-order window as TtsProducer, with tasks instead of threads
+            in_flight = deque()
+            for i, (chunk_voice_id, chunk) in enumerate(chunks, start=1):
+                if self.prefetch is not None:
+                    await self.prefetch.wait_for_room_async()
+                print_colored(f"\nProcessing chunk {i}...", "yellow")
+                data = {"text": chunk, "voice": chunk_voice_id}
+                in_flight.append(asyncio.ensure_future(self.fetch_chunk(data, i, chunk_sizer)))
+                if len(in_flight) >= self.concurrency:
+                    await deliver(await in_flight.popleft())
+            requested.set_result(None)
+            while in_flight:
+                await deliver(await in_flight.popleft())
+        except Exception as e:
+            print_colored(f"Exception while processing TTS data: {e}", "red")
+        finally:
+            if not requested.done():
+                requested.set_result(None)
             try:
-                text = self.text_queue.get()
-                if text is None:  # Exit signal
-                    break
-                for mp3_data in get_mp3_data_chunks(text):
-                    self.nextConsumer.put(mp3_data)
-            except Exception as e:
-                print_colored(f"Exception while processing TTS data: {e}", "red")
+                if previous_delivery is not None:
+                    await asyncio.shield(previous_delivery)
             finally:
-                self.text_queue.task_done()
+                delivery.set_result(None)  # Also when cancelled while waiting, so later texts are never stuck
+
+    def put(self, text_data, submitted_at: float | None = None, voice_id: str | None = None):
+        """
+        Add text data to be synthesized on the event loop.
+        Args:
+            text_data: Text to speak. It may switch voices with [voice-XXX] markup.
+            submitted_at: time.monotonic() timestamp the text became available. Defaults to now.
+            voice_id: Voice to use for this text instead of the producer's voice.
+        """
+        import asyncio
+        submitted_at = time.monotonic() if submitted_at is None else submitted_at
+        self.texts_put += 1
+        coroutine = self.speak(text_data, voice_id or self.voice_id, submitted_at, self.generation)
+        self.pending = [future for future in self.pending if not future.done()]
+        self.pending.append(asyncio.run_coroutine_threadsafe(coroutine, self.loop))
+
+    def drop_pending(self) -> int:
+        """Drop the texts that were put but whose synthesis hasn't started. Returns their number"""
+        import asyncio
+        async def next_generation():
+            # Runs on the loop, so every text has either started or will see the new generation
+            dropped = self.texts_put - self.texts_started - self.dropped_texts
+            self.generation += 1
+            self.dropped_texts += dropped
+            return dropped
+
+        return asyncio.run_coroutine_threadsafe(next_generation(), self.loop).result()
 
-    def put(self, text_data):
-        """Add text data to the queue for playback."""
-        self.text_queue.put(text_data)
+    def flush(self) -> None:
+        """Stop speaking: cancel the synthesis of all texts put so far and flush the next consumer"""
+        import asyncio
+        async def cancel_texts():
+            # Runs on the loop, so no text can start or deliver between the new epoch and the cancellation
+            self.dropped_texts += self.texts_put - self.texts_started - self.dropped_texts
+            self.generation += 1
+            self.epoch += 1
+            self.last_requested = None
+            self.last_delivery = None
+            for task in asyncio.all_tasks(self.loop):
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+        asyncio.run_coroutine_threadsafe(cancel_texts(), self.loop).result()
+        # A hand-over already running in a worker thread finishes before the flush, the ones after it see the new epoch
+        with self.handover_lock:
+            if hasattr(self.nextConsumer, "flush"):
+                self.nextConsumer.flush()
+        self.pending.clear()
+        self.flushes += 1
+
+    def prewarm(self) -> None:
+        """Open a keep-alive connection per concurrent request to the server in the background, ahead of the first chunk request"""
+        import asyncio
+        asyncio.run_coroutine_threadsafe(self.transport.prewarm(self.backend.url, self.concurrency, self.backend.headers), self.loop)
 
     def wait_for_completion(self):
-        """Wait until all text_data is processed and the next consumer is ready"""
-        self.text_queue.join()
-        self.text_queue.put(None)  # Signal the consumer to exit
-        self.consumer_thread.join()  # Wait for consumer thread to finish
+        """Wait until all texts are processed, shut down the event loop and wait for the next consumer"""
+        import asyncio
+        while self.pending:
+            self.pending.pop(0).result()
+        asyncio.run_coroutine_threadsafe(self.transport.aclose(), self.loop).result()
+        asyncio.run_coroutine_threadsafe(self.loop.shutdown_default_executor(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        if self.cache is not None:
+            self.cache.save_index()
         if self.nextConsumer is not None:
             self.nextConsumer.wait_for_completion()
 
+class DecodedAudioCache:
+    """
+    In-memory LRU of decoded audio, keyed by the digest of the mp3 data it was decoded from.
+
+    Each entry holds the raw PCM samples together with the channel count, frame rate and
+    sample width needed to play them back. Entries are evicted least recently used first once
+    the PCM held exceeds the byte budget.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: OrderedDict = OrderedDict()  # digest -> (pcm, channels, frame_rate, sample_width)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(mp3_data: bytes) -> bytes:
+        return hashlib.blake2b(mp3_data, digest_size=16).digest()
+
+    def get(self, key: bytes):
+        """Return the decoded (pcm, channels, frame_rate, sample_width) tuple, or None on a miss"""
+        with self.lock:
+            decoded = self.entries.get(key)
+            if decoded is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return decoded
+
+    def put(self, key: bytes, decoded) -> None:
+        """Store decoded audio and evict the least recently used entries if over budget"""
+        size = len(decoded[0])
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= len(previous[0])
+            self.entries[key] = decoded
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted[0])
+                self.evictions += 1
+
+    def display_stats(self) -> None:
+        print_colored(f"Decoded audio cache: {self.hits} hits, {self.misses} misses, {self.evictions} evictions, "
+                      f"{len(self.entries)} entries ({self.total_bytes / (1024 * 1024):.1f} MB)", "cyan")
+
 class AudioPlayer:
-    """Audio player working on a separate thread"""
-    def __init__(self):
+    """
+    Audio player working on a separate thread.
+
+    A single PyAudio output stream is kept open for the lifetime of the player and is only
+    reopened when the sample format of the audio changes, so consecutive chunks are written
+    back to back without device initialization gaps.
+
+    Audio is written in slices of WRITE_SLICE_SECONDS, so flush() can silence the player within
+    about one slice: it starts a new epoch, drops the queued audio and makes the audio of older
+    epochs stop at the next slice boundary.
+    """
+    def __init__(self, decode_cache: DecodedAudioCache | None = None, prewarm_device: bool = False):
+        self.decode_cache = decode_cache
+        self.prewarm_device = prewarm_device
+        self.first_sound_latencies = []  # seconds from text submission to first sound
+        self.buffer_lock = threading.Lock()
+        self.queued_seconds = 0.0  # duration of the mp3 data waiting in the queue
+        self.streams = []  # AudioStreams queued or playing, whose duration grows as they download
+        self.playing_until = 0.0  # time.monotonic() at which the audio written so far ends
+        self.pyaudio_instance = None
+        self.output_stream = None
+        self.output_format = None  # (channels, frame_rate, sample_width) of the open stream
+        self.epoch = 0  # incremented by flush(); audio put in an older epoch is not played
+        self.flushes = 0
         self.audio_queue = queue.Queue()
         self.consumer_thread = threading.Thread(target=self.audio_consumer)
         self.consumer_thread.daemon = True  # Allows thread to exit when the main program does
         self.consumer_thread.start()
 
+    def decode_audio(self, mp3_data: bytes) -> tuple:
+        """Decodes mp3 data into a (pcm, channels, frame_rate, sample_width) tuple"""
+        from pydub import AudioSegment
+
+        key = None
+        if self.decode_cache is not None:
+            key = DecodedAudioCache.make_key(mp3_data)
+            decoded = self.decode_cache.get(key)
+            if decoded is not None:
+                return decoded
+
+        byte_io = io.BytesIO(mp3_data)
+        audio = AudioSegment.from_file(byte_io, format='mp3')
+
+        # Prepare audio data for PyAudio
+        samples = audio.get_array_of_samples()
+        decoded = (samples.tobytes(), audio.channels, audio.frame_rate, audio.sample_width)
+
+        if key is not None:
+            self.decode_cache.put(key, decoded)
+        return decoded
+
     def audio_consumer(self):
         """Consume audio data from the queue and play it."""
-        
-        def play_audio(mp3_data):
+
+        def play_audio(mp3_data, started_at: float | None, epoch: int):
             """Plays an audio encoded as mp3 data"""
-            from pydub import AudioSegment
+            pcm, channels, frame_rate, sample_width = self.decode_audio(mp3_data)
+            if epoch != self.epoch:
+                return
+            if started_at is not None:
+                self.record_first_sound(started_at)
+            self.write_pcm(pcm, channels, frame_rate, sample_width, epoch)
+
+        def play_stream(audio_stream: AudioStream, started_at: float | None, epoch: int):
+            """Plays mp3 data while it is still being received, decoding it through a piped ffmpeg process"""
+            import subprocess
+            from pydub.utils import get_encoder_name
+
+            # The output format for ffmpeg is taken from the first frame header
+            pieces = iter(audio_stream)
+            head = bytearray()
+            found = None
+            for piece in pieces:
+                head += piece
+                found = find_mp3_frame(head)
+                if found is not None:
+                    break
+            if found is None:
+                return
+            _, (_, frame_rate, channels, _) = found
+            sample_width = 2
+
+            process = subprocess.Popen([get_encoder_name(), "-hide_banner", "-loglevel", "error",
+                                        "-f", "mp3", "-i", "pipe:0",
+                                        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", str(channels), "-ar", str(frame_rate), "pipe:1"],
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+            def feed_decoder():
+                try:
+                    process.stdin.write(head)
+                    for piece in pieces:
+                        process.stdin.write(piece)
+                        process.stdin.flush()
+                except OSError:
+                    pass  # ffmpeg exited early, the error shows up on its stderr
+                finally:
+                    try:
+                        process.stdin.close()
+                    except OSError:
+                        pass
+
+            feeder = threading.Thread(target=feed_decoder, daemon=True)
+            feeder.start()
+
+            frame_bytes = sample_width * channels
+            decoded = bytearray()
+            pending = b""
+            flushed = False
+            try:
+                while True:
+                    pcm = process.stdout.read1(STREAM_READ_SIZE)
+                    if not pcm:
+                        break
+                    # PyAudio needs whole frames, keep any partial frame for the next write
+                    pcm = pending + pcm
+                    usable = len(pcm) - len(pcm) % frame_bytes
+                    pcm, pending = pcm[:usable], pcm[usable:]
+                    if not pcm:
+                        continue
+                    if started_at is not None and epoch == self.epoch:
+                        self.record_first_sound(started_at)
+                        started_at = None
+                    with self.buffer_lock:
+                        audio_stream.played_seconds += len(pcm) / (frame_bytes * frame_rate)
+                    if not self.write_pcm(pcm, channels, frame_rate, sample_width, epoch):
+                        flushed = True
+                        process.kill()
+                        break
+                    if self.decode_cache is not None:
+                        decoded += pcm
+            finally:
+                process.stdout.close()
+                process.wait()
+                if not flushed:
+                    feeder.join()  # After a flush it ends on its own once the producer abandons the download
+
+            if self.decode_cache is not None and audio_stream.complete and not flushed:
+                key = DecodedAudioCache.make_key(bytes(audio_stream.received))
+                self.decode_cache.put(key, (bytes(decoded), channels, frame_rate, sample_width))
+            if not flushed:
+                audio_stream.release()  # The download finished and was cached, the pieces were played
+
+        if self.prewarm_device:
+            self.prewarm_audio_device()
+
+        try:
+            while True:
+                try:
+                    item = self.audio_queue.get()
+                    if item is None:  # Exit signal
+                        break
+                    mp3_byte_data, started_at, duration, epoch = item
+                    with self.buffer_lock:
+                        if epoch != self.epoch:
+                            continue  # Flushed; its duration no longer counts as queued
+                        self.queued_seconds -= duration
+                    if isinstance(mp3_byte_data, AudioStream):
+                        try:
+                            play_stream(mp3_byte_data, started_at, epoch)
+                        finally:
+                            with self.buffer_lock:
+                                if mp3_byte_data in self.streams:
+                                    self.streams.remove(mp3_byte_data)
+                    else:
+                        play_audio(mp3_byte_data, started_at, epoch)
+                except Exception as e:
+                    print_colored(f"Exception while processing mp3 data: {e}", "red")
+                    self.release_audio_device()
+                finally:
+                    self.audio_queue.task_done()
+        finally:
+            self.release_audio_device()
+
+    def prewarm_audio_device(self) -> None:
+        """Import the audio libraries and initialize PyAudio while the first audio is still being synthesized"""
+        try:
+            import pydub  # Only imported here so that the first decode doesn't pay for it
             import pyaudio
-            
-            byte_io = io.BytesIO(mp3_data)
-            audio = AudioSegment.from_file(byte_io, format='mp3')
+            if self.pyaudio_instance is None:
+                self.pyaudio_instance = pyaudio.PyAudio()
+        except Exception as e:
+            print_colored(f"Could not prepare the audio device: {e}", "yellow")
+
+    def write_pcm(self, pcm: bytes, channels: int, frame_rate: int, sample_width: int, epoch: int | None = None) -> bool:
+        """
+        Write PCM samples to the output stream, (re)opening it if the sample format changed.
+        Returns:
+            False if the player was flushed since the given epoch before all samples were written.
+        """
+        import pyaudio
+
+        output_format = (channels, frame_rate, sample_width)
+        if self.output_stream is None or self.output_format != output_format:
+            self.close_output_stream()
+            if self.pyaudio_instance is None:
+                self.pyaudio_instance = pyaudio.PyAudio()
+            self.output_stream = self.pyaudio_instance.open(format=self.pyaudio_instance.get_format_from_width(sample_width),
+                                                            channels=channels,
+                                                            rate=frame_rate,
+                                                            output=True)
+            self.output_format = output_format
+
+        frame_bytes = channels * sample_width
+        slice_bytes = max(1, int(frame_rate * WRITE_SLICE_SECONDS)) * frame_bytes
+        pcm = memoryview(pcm)
+        for start in range(0, len(pcm), slice_bytes):
+            pcm_slice = pcm[start:start + slice_bytes]
+            with self.buffer_lock:
+                if epoch is not None and epoch != self.epoch:
+                    return False
+                self.playing_until = max(self.playing_until, time.monotonic()) + len(pcm_slice) / (frame_bytes * frame_rate)
+            self.output_stream.write(bytes(pcm_slice))
+        return True
 
-            # Prepare audio data for PyAudio
-            samples = audio.get_array_of_samples()
+    def close_output_stream(self) -> None:
+        """Let the output stream finish playing, then close it"""
+        if self.output_stream is not None:
+            try:
+                self.output_stream.stop_stream()
+                self.output_stream.close()
+            except Exception as e:
+                print_colored(f"Exception while closing audio stream: {e}", "red")
+            self.output_stream = None
+            self.output_format = None
 
-            # Initialize PyAudio
-            p = pyaudio.PyAudio()
+    def release_audio_device(self) -> None:
+        """Close the output stream and terminate PyAudio"""
+        self.close_output_stream()
+        if self.pyaudio_instance is not None:
+            self.pyaudio_instance.terminate()
+            self.pyaudio_instance = None
 
-            # Open stream
-            stream = p.open(format=pyaudio.paInt16,
-                            channels=audio.channels,
-                            rate=audio.frame_rate,
-                            output=True)
+    def record_first_sound(self, started_at: float) -> None:
+        """Record and report the time from text submission to its first sound"""
+        latency = time.monotonic() - started_at
+        self.first_sound_latencies.append(latency)
+        print_colored(f"Time to first sound: {latency * 1000:.0f} ms", "cyan")
 
-            # Play the audio
-            stream.write(samples.tobytes())
+    def display_stats(self) -> None:
+        if not self.first_sound_latencies:
+            return
+        latencies = sorted(self.first_sound_latencies)
+        print_colored(f"Time to first sound: median {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+                      f"best {latencies[0] * 1000:.0f} ms, worst {latencies[-1] * 1000:.0f} ms over {len(latencies)} texts", "cyan")
 
-            # Wait for the stream to finish
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
+    def put(self, mp3_byte_data, started_at: float | None = None):
+        """
+        Add audio data to the queue for playback.
+        Args:
+            mp3_byte_data: mp3 data, or an AudioStream that is still being received.
+            started_at: time.monotonic() timestamp of the text submission, if this is its first audio.
+        """
+        # Streams are still downloading, their audio counts as buffered as it arrives
+        is_stream = isinstance(mp3_byte_data, AudioStream)
+        duration = 0.0 if is_stream else mp3_duration(mp3_byte_data)
+        with self.buffer_lock:
+            self.queued_seconds += duration
+            if is_stream:
+                self.streams.append(mp3_byte_data)
+            epoch = self.epoch
+        self.audio_queue.put((mp3_byte_data, started_at, duration, epoch))
 
+    def flush(self) -> None:
+        """Stop the audio being played within about WRITE_SLICE_SECONDS and drop all queued audio"""
+        with self.buffer_lock:
+            self.epoch += 1
+            self.queued_seconds = 0.0
+            self.streams.clear()
+            self.playing_until = time.monotonic()
         while True:
             try:
-                mp3_byte_data = self.audio_queue.get()
-                if mp3_byte_data is None:  # Exit signal
-                    break
-                play_audio(mp3_byte_data)
-            except Exception as e:
-                print_colored(f"Exception while processing mp3 data: {e}", "red")
-            finally:
-                self.audio_queue.task_done()
+                item = self.audio_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.audio_queue.task_done()
+            if item is None:  # Keep the exit signal
+                self.audio_queue.put(None)
+                break
+        self.flushes += 1
 
-    def put(self, mp3_byte_data):
-        """Add audio data to the queue for playback."""
-        self.audio_queue.put(mp3_byte_data)
+    def buffered_seconds(self) -> float:
+        """Seconds of audio queued, downloaded by streams but not yet played, or still playing ahead of the playhead"""
+        with self.buffer_lock:
+            streamed = sum(max(0.0, stream.seconds - stream.played_seconds) for stream in self.streams)
+            return self.queued_seconds + streamed + max(0.0, self.playing_until - time.monotonic())
 
     def wait_for_completion(self):
         """Wait until all audio tasks are done."""
@@ -455,26 +3056,143 @@ class AudioPlayer:
         self.audio_queue.put(None)  # Signal the consumer to exit
         self.consumer_thread.join()  # Wait for consumer thread to finish
 
+# Bump when the layout of the compiled voice catalog changes
+VOICE_CATALOG_VERSION = 1
+
 class VoiceManager:
-    """Manager for audio voices that can be used with speechma"""
+    """
+    Manager for audio voices that can be used with speechma.
+
+    The nested voices structure (language, country, gender, name) is indexed once when it is
+    loaded, so that lookups, validation and menu listings don't have to walk it again. The
+    indexed tables are kept in a compiled catalog next to the voices JSON file, which is loaded
+    in one go on later runs and rebuilt when the JSON file changes.
+    """
     def __init__(self):
         self.voices = {}
         self.voices_path = "voices.json"
+        self.voice_index = {}  # voice ID -> (language, country, gender, name)
+        self.voice_ids = {}  # (language, country, gender, name) -> voice ID
+        self.children = {}  # path of keys -> sorted keys one level below it
+        self.voice_counts = {}  # path of keys -> number of voices below it
+        self.voice_stats = {'languages': [], 'countries': [], 'genders': []}
 
     def load_voices(self) -> bool:
-        """Load voices from the JSON file"""
+        """
+        Load voices from the compiled catalog next to the JSON file, or from the JSON file itself if
+        the catalog is missing or out of date. In the latter case the catalog is rebuilt.
+        """
         try:
-            with open(self.voices_path, 'r') as f:
-                voices = json.load(f)
-                if not voices:
-                    return False
-                self.voices = voices
-                return True
+            source_stat = os.stat(self.voices_path)
         except FileNotFoundError:
             print_colored(f"Error: {self.voices_path} file not found.", "red")
-        except json.JSONDecodeError:
-            print_colored(f"Error: {self.voices_path} is not a valid JSON file.", "red")
-        return False
+            return False
+
+        catalog = self.load_catalog()
+        if catalog is not None and (catalog["source_mtime_ns"], catalog["source_size"]) == (source_stat.st_mtime_ns, source_stat.st_size):
+            self.apply_catalog(catalog)
+            return bool(self.voices)
+
+        try:
+            with open(self.voices_path, 'rb') as f:
+                source = f.read()
+        except OSError as e:
+            print_colored(f"Error: failed to read {self.voices_path}: {e}", "red")
+            return False
+
+        source_hash = hashlib.sha256(source).hexdigest()
+        if catalog is not None and catalog["source_hash"] == source_hash:
+            # Only the timestamp changed, e.g. after a checkout: keep the catalog but record the new mtime
+            self.apply_catalog(catalog)
+        else:
+            try:
+                voices = json.loads(source)
+            except json.JSONDecodeError:
+                print_colored(f"Error: {self.voices_path} is not a valid JSON file.", "red")
+                return False
+            if not voices:
+                return False
+            self.voices = voices
+            self.build_index()
+
+        self.save_catalog(source_stat, source_hash)
+        return bool(self.voices)
+
+    def catalog_path(self) -> str:
+        """Path of the compiled catalog, stored next to the voices JSON file"""
+        return f"{os.path.splitext(self.voices_path)[0]}.catalog"
+
+    def load_catalog(self) -> Dict | None:
+        """Load the compiled catalog, returning None if it is missing, unreadable or from another version"""
+        try:
+            with open(self.catalog_path(), "rb") as f:
+                catalog = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            return None  # Corrupt or written by an incompatible Python: rebuild it
+        if not isinstance(catalog, dict) or catalog.get("version") != VOICE_CATALOG_VERSION:
+            return None
+        return catalog
+
+    def apply_catalog(self, catalog: Dict) -> None:
+        self.voices = catalog["voices"]
+        self.voice_index = catalog["voice_index"]
+        self.voice_ids = catalog["voice_ids"]
+        self.children = catalog["children"]
+        self.voice_counts = catalog["voice_counts"]
+        self.voice_stats = catalog["voice_stats"]
+
+    def save_catalog(self, source_stat: os.stat_result, source_hash: str) -> None:
+        """Write the compiled catalog for the current voices"""
+        catalog = {
+            "version": VOICE_CATALOG_VERSION,
+            "source_mtime_ns": source_stat.st_mtime_ns,
+            "source_size": source_stat.st_size,
+            "source_hash": source_hash,
+            "voices": self.voices,
+            "voice_index": self.voice_index,
+            "voice_ids": self.voice_ids,
+            "children": self.children,
+            "voice_counts": self.voice_counts,
+            "voice_stats": self.voice_stats,
+        }
+        path = self.catalog_path()
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(catalog, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print_colored(f"Could not write voice catalog '{path}': {e}", "yellow")
+
+    def build_index(self) -> None:
+        """Build the flat lookup tables from the nested voices structure"""
+        self.voice_index = {}
+        self.voice_ids = {}
+        self.children = {}
+        self.voice_counts = {}
+
+        def index_recursive(data, path):
+            count = 0
+            for key, value in data.items():
+                if isinstance(value, dict):
+                    count += index_recursive(value, path + (key,))
+                else:
+                    self.voice_index[value] = path + (key,)
+                    self.voice_ids[path + (key,)] = value
+                    count += 1
+            self.children[path] = sorted(data.keys())
+            self.voice_counts[path] = count
+            return count
+
+        index_recursive(self.voices, ())
+
+        levels = [set(), set(), set()]  # languages, countries, genders
+        for path in self.voice_index.values():
+            for keys, key in zip(levels, path[:-1]):
+                keys.add(key)
+        self.voice_stats = {'languages': sorted(levels[0]), 'countries': sorted(levels[1]), 'genders': sorted(levels[2])}
 
     def is_valid_voice(self, voice_id: str) -> bool:
         """
@@ -482,66 +3200,57 @@ class VoiceManager:
 
         Returns True if voice_id was found among the leaf voice IDs, False otherwise.
         """
-        if not voice_id or not self.voices:
-            return False
-        # get_all_voice_ids yields all leaf voice ids from the nested structure
-        return any(voice_id == vid for vid in get_all_voice_ids(self.voices))
-    
-    def get_voice_description_for_id(self, voice_id: str) -> str | None:
-        """Get the voice language, country, name, and gender for a given voice ID"""
+        return bool(voice_id) and voice_id in self.voice_index
 
-        def find_name_recursive(data):
-            for key, value in data.items():
-                if isinstance(value, dict):
-                    result = find_name_recursive(value)
-                    if result:
-                        # Prepend the current key to the deeper result to build a hierarchical description
-                        return f"{result}, {key}"
-                else:
-                    if value == voice_id:
-                        return key
+    def get_voice_description_for_id(self, voice_id: str) -> str | None:
+        """Get the voice name, gender, country and language for a given voice ID"""
+        path = self.voice_index.get(voice_id)
+        if path is None:
             return None
+        return ", ".join(reversed(path))
 
-        return find_name_recursive(self.voices)
-    
     def count_voice_stats(self):
         """Function to count voices in the hierarchical structure"""
-        stats = {
-            'total': 0,
-            'languages': set(),
-            'countries': set(),
-            'genders': set()
+        return {
+            'total': len(self.voice_index),
+            'languages': set(self.voice_stats['languages']),
+            'countries': set(self.voice_stats['countries']),
+            'genders': set(self.voice_stats['genders'])
         }
 
-        def count_recursive(data, level=0):
-            for key, value in data.items():
-                if isinstance(value, dict):
-                    if level == 0:  # Language level
-                        stats['languages'].add(key)
-                    elif level == 1:  # Country level
-                        stats['countries'].add(key)
-                    elif level == 2:  # Gender level
-                        stats['genders'].add(key)
-                    count_recursive(value, level + 1)
-                else:
-                    stats['total'] += 1
-
-        count_recursive(self.voices)
-        return stats
-    
     def display_stats(self):
         # Display statistics
-        stats = self.count_voice_stats()
-        print_colored(f"Voice Library: {stats['total']} voices", "yellow")
-        print(f"   • {len(stats['languages'])} languages")
-        print(f"   • {len(stats['countries'])} countries")
+        print_colored(f"Voice Library: {len(self.voice_index)} voices", "yellow")
+        print(f"   • {len(self.voice_stats['languages'])} languages")
+        print(f"   • {len(self.voice_stats['countries'])} countries")
         print_colored("=" * 60, "cyan")
 
 class FileMonitorOption(Enum):
     ONCE = "once"
     UPDATES = "updates"
+    INCREMENTAL = "incremental"
     DEFAULT = ONCE
 
+class EngineOption(Enum):
+    THREADED = "threaded"
+    ASYNC = "async"
+    DEFAULT = THREADED
+
+class ChunkingOption(Enum):
+    FIXED = "fixed"
+    ADAPTIVE = "adaptive"
+    DEFAULT = ADAPTIVE
+
+DEFAULT_CONCURRENCY = 3
+DEFAULT_CACHE_DIR = "tts_cache"
+DEFAULT_CACHE_SIZE_MB = 200
+DEFAULT_DECODE_CACHE_SIZE_MB = 64
+DEFAULT_OUTPUT_DIR = "audio"
+DEFAULT_OUTPUT_FORMAT = "mp3"
+DEFAULT_DEBOUNCE_MS = 250
+DEFAULT_PREFETCH_SECONDS = 30
+DEFAULT_RATE_LIMIT = 0
+
 class Settings:
     """Manager for application settings loaded from a JSON file and/or command line arguments"""
 
@@ -560,6 +3269,54 @@ class Settings:
                 print_colored(f"Invalid value for file monitor: {file_monitor_string}. Using default value '{FileMonitorOption.DEFAULT.value}'.", "yellow")
                 return FileMonitorOption.DEFAULT
 
+        def convertToChunkingOption(chunking_string):
+            """
+            Convert string to ChunkingOption enum, with default fallback.
+            Args:
+                chunking_string: String representation of the chunking option.
+            Returns:
+                ChunkingOption enum value.
+            """
+            try:
+                return ChunkingOption(chunking_string)
+            except ValueError:
+                print_colored(f"Invalid value for chunking: {chunking_string}. Using default value '{ChunkingOption.DEFAULT.value}'.", "yellow")
+                return ChunkingOption.DEFAULT
+
+        def convertToEngineOption(engine_string):
+            """
+            Convert string to EngineOption enum, with default fallback.
+            Args:
+                engine_string: String representation of the engine option.
+            Returns:
+                EngineOption enum value.
+            """
+            try:
+                return EngineOption(engine_string)
+            except ValueError:
+                print_colored(f"Invalid value for engine: {engine_string}. Using default value '{EngineOption.DEFAULT.value}'.", "yellow")
+                return EngineOption.DEFAULT
+
+        def convertToInt(value, name: str, default: int, minimum: int = 1) -> int:
+            """
+            Convert a numeric setting to an integer no smaller than a minimum, with default fallback.
+            Args:
+                value: Setting value, as int or string.
+                name: Name of the setting, used in the warning message.
+                default: Value used when the setting is invalid.
+                minimum: Smallest accepted value.
+            Returns:
+                Integer value of the setting.
+            """
+            try:
+                converted = int(value)
+                if converted >= minimum:
+                    return converted
+            except (TypeError, ValueError):
+                pass
+            print_colored(f"Invalid value for {name}: {value}. Using default value '{default}'.", "yellow")
+            return default
+
         def parse_args() -> argparse.Namespace:
             """
             Parse command line arguments.
@@ -572,9 +3329,36 @@ class Settings:
             parser.add_argument("--text", "-t", help="Text to speak (single utterance).")
             parser.add_argument("--file", "-f", help="Read text from file and send as single utterance.")
             parser.add_argument("--voices", help="Path to voices.json (default: voices.json)")
+            parser.add_argument("--output", "-o", help="Write the audio to this mp3 file instead of playing it.")
+            parser.add_argument("--batch", "-b", help="Render a directory of .txt files, or the files matching a glob pattern, to audio files instead of playing them.")
+            parser.add_argument("--outputDir", help=f"Directory for audio files rendered with --batch (default: {DEFAULT_OUTPUT_DIR}).")
+            parser.add_argument("--outputFormat", help=f"Audio format of files rendered with --batch, e.g. mp3, wav or ogg (default: {DEFAULT_OUTPUT_FORMAT}).")
+            parser.add_argument("--follow", action="store_true",
+                                help="Follow --file like 'tail -F', or stdin if no file is given or it is '-', and speak each sentence as it is written. Also works with named pipes.")
             parser.add_argument('--fileMonitor',
                                 choices=[option.value for option in FileMonitorOption],
-                                help="Specify 'once' to read the file once, or 'updates' to monitor for updates.")
+                                help="Specify 'once' to read the file once, 'updates' to monitor for updates, or 'incremental' to speak only new and changed sentences.")
+            parser.add_argument("--debounce", type=int, help=f"Milliseconds without further changes before a monitored file is read again (default: {DEFAULT_DEBOUNCE_MS}).")
+            parser.add_argument("--concurrency", "-c", type=int, help="Number of text chunks requested from the server at once (default: 3).")
+            parser.add_argument("--engine",
+                                choices=[option.value for option in EngineOption],
+                                help="Specify 'threaded' for the thread based synthesis engine, or 'async' for the asyncio engine (requires httpx).")
+            parser.add_argument("--chunking",
+                                choices=[option.value for option in ChunkingOption],
+                                help="Specify 'adaptive' to start with a short chunk and grow later ones, or 'fixed' to always use the maximum chunk size.")
+            parser.add_argument("--prefetch", type=int, help=f"Seconds of audio to synthesize ahead of playback, 0 for no limit (default: {DEFAULT_PREFETCH_SECONDS}).")
+            parser.add_argument("--rateLimit", type=int, help=f"Maximum number of requests per minute sent to the server, 0 for no limit (default: {DEFAULT_RATE_LIMIT}).")
+            parser.add_argument("--rateLimitFile", help="Share the --rateLimit with every process using this file.")
+            parser.add_argument("--poolSize", type=int, help="Number of keep-alive connections to the server (default: two per concurrent request).")
+            parser.add_argument("--connectTimeout", type=int, help=f"Seconds to wait for a connection to the server (default: {DEFAULT_CONNECT_TIMEOUT}).")
+            parser.add_argument("--readTimeout", type=int, help=f"Seconds to wait for data from the server before a request fails (default: {DEFAULT_READ_TIMEOUT}).")
+            parser.add_argument("--http2", action="store_true", help="Use HTTP/2 with the async engine (requires httpx[http2]).")
+            parser.add_argument("--server", help="URL of a server speaking the Speechma API to use instead, e.g. benchmarks/stub_server.py.")
+            parser.add_argument("--streaming", action="store_true", help="Start playing audio while it is still being downloaded.")
+            parser.add_argument("--noCache", action="store_true", help="Disable the on-disk audio cache.")
+            parser.add_argument("--cacheSize", type=int, help=f"Maximum size of the on-disk audio cache in MB (default: {DEFAULT_CACHE_SIZE_MB}).")
+            parser.add_argument("--decodeCacheSize", type=int, help=f"Memory budget in MB for decoded audio kept for repeated playback, 0 to disable (default: {DEFAULT_DECODE_CACHE_SIZE_MB}).")
+            parser.add_argument("--verbose", action="store_true", help="Show the header, settings and voice statistics when not in interactive mode.")
             args = parser.parse_args()
             return args
 
@@ -593,7 +3377,7 @@ class Settings:
                     with open(path, "r", encoding="utf-8") as sh:
                         loaded = json.load(sh)
                     if isinstance(loaded, dict):
-                        print(f"Loaded settings from '{path}'")
+                        self.settings_path = path
                         return loaded
                     print_colored(f"Settings file '{path}' does not contain a JSON object; ignoring.", "yellow")
                 return {}
@@ -604,6 +3388,7 @@ class Settings:
             return {}
         
         args = parse_args()
+        self.settings_path = None  # settings file that was loaded, if any
         settings_file = load_settings_from_file(args.settings)
         
         # Load settings (CLI takes precedence over settings values)
@@ -613,21 +3398,249 @@ class Settings:
         self.voices_path = args.voices if args.voices is not None else settings_file.get("voices", "voices.json")
         file_monitor_string = args.fileMonitor if args.fileMonitor is not None else settings_file.get("fileMonitor", FileMonitorOption.DEFAULT.value)
         self.file_monitor = convertToFileMonitorOption(file_monitor_string)
+        debounce_value = args.debounce if args.debounce is not None else settings_file.get("debounce", DEFAULT_DEBOUNCE_MS)
+        self.debounce_ms = convertToInt(debounce_value, "debounce", DEFAULT_DEBOUNCE_MS, minimum=0)
         self.ffmpeg_bin_path = settings_file.get("ffmpegBinPath", None)
-        self.display_stats = not (self.text or self.file)
+        concurrency_value = args.concurrency if args.concurrency is not None else settings_file.get("concurrency", DEFAULT_CONCURRENCY)
+        self.concurrency = convertToInt(concurrency_value, "concurrency", DEFAULT_CONCURRENCY)
+        engine_string = args.engine if args.engine is not None else settings_file.get("engine", EngineOption.DEFAULT.value)
+        self.engine = convertToEngineOption(engine_string)
+        chunking_string = args.chunking if args.chunking is not None else settings_file.get("chunking", ChunkingOption.DEFAULT.value)
+        self.chunking = convertToChunkingOption(chunking_string)
+        prefetch_value = args.prefetch if args.prefetch is not None else settings_file.get("prefetch", DEFAULT_PREFETCH_SECONDS)
+        self.prefetch_seconds = convertToInt(prefetch_value, "prefetch", DEFAULT_PREFETCH_SECONDS, minimum=0)
+        rate_limit_value = args.rateLimit if args.rateLimit is not None else settings_file.get("rateLimit", DEFAULT_RATE_LIMIT)
+        self.rate_limit = convertToInt(rate_limit_value, "rate limit", DEFAULT_RATE_LIMIT, minimum=0)
+        self.rate_limit_file = args.rateLimitFile if args.rateLimitFile is not None else settings_file.get("rateLimitFile")
+        pool_size_value = args.poolSize if args.poolSize is not None else settings_file.get("poolSize", DEFAULT_POOL_SIZE)
+        self.pool_size = convertToInt(pool_size_value, "pool size", DEFAULT_POOL_SIZE) if pool_size_value is not None else None
+        connect_timeout_value = args.connectTimeout if args.connectTimeout is not None else settings_file.get("connectTimeout", DEFAULT_CONNECT_TIMEOUT)
+        self.connect_timeout = convertToInt(connect_timeout_value, "connect timeout", DEFAULT_CONNECT_TIMEOUT)
+        read_timeout_value = args.readTimeout if args.readTimeout is not None else settings_file.get("readTimeout", DEFAULT_READ_TIMEOUT)
+        self.read_timeout = convertToInt(read_timeout_value, "read timeout", DEFAULT_READ_TIMEOUT)
+        self.http2 = True if args.http2 else bool(settings_file.get("http2", False))
+        self.server = args.server if args.server is not None else settings_file.get("server")
+        self.streaming = True if args.streaming else bool(settings_file.get("streaming", False))
+        self.cache_enabled = False if args.noCache else bool(settings_file.get("cache", True))
+        self.cache_dir = settings_file.get("cacheDir", DEFAULT_CACHE_DIR)
+        cache_size_value = args.cacheSize if args.cacheSize is not None else settings_file.get("cacheSize", DEFAULT_CACHE_SIZE_MB)
+        self.cache_size_mb = convertToInt(cache_size_value, "cache size", DEFAULT_CACHE_SIZE_MB, minimum=0)
+        if self.cache_size_mb <= 0:
+            self.cache_enabled = False
+        decode_cache_size_value = args.decodeCacheSize if args.decodeCacheSize is not None else settings_file.get("decodeCacheSize", DEFAULT_DECODE_CACHE_SIZE_MB)
+        self.decode_cache_size_mb = convertToInt(decode_cache_size_value, "decoded audio cache size", DEFAULT_DECODE_CACHE_SIZE_MB, minimum=0)
+        self.follow = True if args.follow else bool(settings_file.get("follow", False))
+        self.output = args.output if args.output is not None else settings_file.get("output")
+        self.batch = args.batch if args.batch is not None else settings_file.get("batch")
+        self.output_dir = args.outputDir if args.outputDir is not None else settings_file.get("outputDir", DEFAULT_OUTPUT_DIR)
+        self.output_format = args.outputFormat if args.outputFormat is not None else settings_file.get("outputFormat", DEFAULT_OUTPUT_FORMAT)
+        self.verbose = True if args.verbose else bool(settings_file.get("verbose", False))
+        # Interactive runs start with the header, settings and voice statistics, the others only when verbose
+        self.display_stats = self.verbose or not (self.text or self.file or self.batch or self.follow)
 
     def display_settings(self):
         """
         Display current settings.
         """
+        if self.settings_path:
+            print(f"Loaded settings from '{self.settings_path}'")
         print_colored("Current Settings:", "cyan")
         print(f"  Voice ID: {self.voice_id if self.voice_id else 'None (interactive selection)'}")
         print(f"  Text: {'Provided' if self.text else 'None'}")
         print(f"  File: '{self.file if self.file else 'None'}'")
-        print(f"  File Monitor: {self.file_monitor.value}")
+        print(f"  File Monitor: {self.file_monitor.value} (debounce {self.debounce_ms} ms)")
+        print(f"  Follow: {'Enabled' if self.follow else 'Disabled'}")
+        print(f"  Concurrency: {self.concurrency}")
+        print(f"  Engine: {self.engine.value}")
+        print(f"  Chunking: {self.chunking.value}")
+        print(f"  Prefetch: {f'{self.prefetch_seconds} s ahead' if self.prefetch_seconds else 'Unlimited'}")
+        rate_limit_sharing = f" shared through '{self.rate_limit_file}'" if self.rate_limit_file else ""
+        print(f"  Rate Limit: {f'{self.rate_limit} requests per minute{rate_limit_sharing}' if self.rate_limit else 'Unlimited'}")
+        print(f"  Connections: {connection_pool_size(self.pool_size, self.concurrency)} kept alive, timeouts {self.connect_timeout} s to connect, "
+              f"{self.read_timeout} s to read, {'HTTP/2' if self.http2 else 'HTTP/1.1'}")
+        print(f"  Server: {self.server or SPEECHMA_URL}")
+        print(f"  Streaming: {'Enabled' if self.streaming else 'Disabled'}")
+        print(f"  Audio Cache: {f'{self.cache_size_mb} MB in {self.cache_dir!r}' if self.cache_enabled else 'Disabled'}")
+        print(f"  Decoded Audio Cache: {f'{self.decode_cache_size_mb} MB' if self.decode_cache_size_mb else 'Disabled'}")
         print(f"  Voices Path: '{self.voices_path}'")
+        if self.output:
+            print(f"  Output: '{self.output}'")
+        if self.batch:
+            print(f"  Batch: '{self.batch}' to '{self.output_dir}' as {self.output_format}")
+        print(f"  Verbose: {'Enabled' if self.verbose else 'Disabled'}")
         print_colored("=" * 60, "cyan")
 
+def render_audio_file(mp3_chunks: list, output_path: str, output_format: str) -> str:
+    """
+    Join mp3 chunks into one audio file in the given format with pydub/ffmpeg.
+    Runs in a worker process of the batch renderer.
+    Returns:
+        Path of the written file.
+    """
+    from pydub import AudioSegment
+
+    audio = AudioSegment.empty()
+    for mp3_data in mp3_chunks:
+        audio += AudioSegment.from_file(io.BytesIO(mp3_data), format="mp3")
+    # Write next to the target first so an interrupted render is never mistaken for a finished one
+    part_path = f"{output_path}.part"
+    audio.export(part_path, format=output_format)
+    os.replace(part_path, output_path)
+    return output_path
+
+class BatchFileWriter:
+    """
+    Consumer that writes the audio of one batch input to a file once its text is complete.
+    mp3 output is joined frame by frame as chunks arrive; other formats are converted by ffmpeg
+    in a worker process of the render executor. If the audio of a chunk is missing, the file is
+    not written, so the input is rendered again by the next run.
+    """
+    def __init__(self, input_path: str, output_path: str, output_format: str, render_executor: Executor):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.output_format = output_format
+        self.render_executor = render_executor
+        self.mp3_writer = Mp3FileWriter(output_path) if output_format == "mp3" else None
+        self.chunks = []
+        self.render_future = None
+        self.missing_chunks = 0
+        self.written = False
+
+    def put(self, mp3_byte_data, started_at: float | None = None):
+        if self.mp3_writer is not None:
+            self.mp3_writer.put(mp3_byte_data)
+        else:
+            self.chunks.append(mp3_byte_data)
+
+    def chunk_missing(self):
+        """Record a chunk whose audio could not be synthesized"""
+        self.missing_chunks += 1
+
+    def end_of_text(self):
+        """Finish the mp3 file, or hand the collected audio to a worker process for rendering"""
+        if self.missing_chunks:
+            print_colored(f"Failed to render '{self.input_path}', the audio of {self.missing_chunks} chunk(s) is missing", "red")
+            if self.mp3_writer is not None:
+                self.mp3_writer.discard()
+            self.chunks = []
+            return
+        if self.mp3_writer is not None:
+            self.written = self.mp3_writer.finish()
+            return
+        if not self.chunks:
+            print_colored(f"No audio was produced for '{self.input_path}'", "red")
+            return
+        self.render_future = self.render_executor.submit(render_audio_file, self.chunks, self.output_path, self.output_format)
+        self.chunks = []
+
+    def wait_for_completion(self):
+        """Wait until the file is rendered"""
+        if self.render_future is None:
+            return
+        try:
+            self.render_future.result()
+            self.written = True
+            print_colored(f"Audio saved to {self.output_path}", "green")
+        except Exception as e:
+            print_colored(f"Failed to render '{self.output_path}': {e}", "red")
+
+def find_batch_inputs(batch_path: str) -> list:
+    """Text files to render: all .txt files of a directory, or the files matching a glob pattern"""
+    if os.path.isdir(batch_path):
+        return sorted(glob.glob(os.path.join(batch_path, "*.txt")))
+    return sorted(path for path in glob.glob(batch_path, recursive=True) if os.path.isfile(path))
+
+def batch_output_path(input_path: str, batch_path: str, output_dir: str, output_format: str) -> str:
+    """
+    Audio file of a batch input: its path relative to the batch directory, or to the directory of a
+    glob pattern before its first wildcard, under output_dir, with the extension of the format.
+    """
+    if os.path.isdir(batch_path):
+        root = batch_path
+    else:
+        wildcard = min((index for index in (batch_path.find(char) for char in "*?[") if index != -1), default=len(batch_path))
+        root = os.path.dirname(batch_path[:wildcard])
+    relative_path = os.path.splitext(os.path.relpath(input_path, root or os.curdir))[0]
+    return os.path.join(output_dir, f"{relative_path}.{output_format}")
+
+def is_output_up_to_date(input_path: str, output_path: str) -> bool:
+    """Whether the output exists and is at least as new as its input"""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(input_path)
+    except OSError:
+        return False
+
+def render_batch(batch_path: str, output_dir: str, output_format: str, voice_id: str, concurrency: int,
+                 cache: AudioCache | None, rate_limiter: RateLimiter | None = None, transport: HttpTransport | None = None,
+                 backend: TtsBackend | None = None, is_valid_voice=None) -> None:
+    """
+    Render every input text file to one audio file, skipping those whose output is up to date.
+    Subdirectories of the inputs are mirrored in output_dir. Inputs that would be rendered to the
+    same file, e.g. 'notes.txt' and 'notes.md', are reported and nothing is rendered.
+    Args:
+        batch_path: Directory of .txt files or a glob pattern.
+        output_dir: Directory the audio files are written to.
+        output_format: Audio format of the files, as understood by ffmpeg (e.g. mp3, wav, ogg).
+        voice_id: Voice to use for text without [voice-XXX] markup.
+        concurrency: Number of chunk requests in flight across all files.
+        cache: Audio cache to use, if any.
+        rate_limiter: Rate limiter for the requests, if any. They are sent at bulk priority.
+        transport: Connections to send the requests through. Defaults to a new pool.
+        backend: Service to request the audio from. Defaults to Speechma.
+        is_valid_voice: Function checking the voices of [voice-XXX] switches, if any.
+    """
+    inputs = find_batch_inputs(batch_path)
+    if not inputs:
+        print_colored(f"No text files found for '{batch_path}'", "red")
+        return
+    output_paths = {input_path: batch_output_path(input_path, batch_path, output_dir, output_format) for input_path in inputs}
+    inputs_by_output = {}
+    for input_path, output_path in output_paths.items():
+        inputs_by_output.setdefault(output_path, []).append(input_path)
+    clashes = {output_path: paths for output_path, paths in inputs_by_output.items() if len(paths) > 1}
+    for output_path, paths in clashes.items():
+        print_colored(f"{', '.join(repr(path) for path in paths)} would be rendered to the same file '{output_path}'", "red")
+    if clashes:
+        print_colored("Rename them or render them in separate batches", "red")
+        return
+
+    start = time.monotonic()
+    total_chars = 0
+    writers = []
+    # Synthesis is network bound and shares one producer pool; converting to formats other than mp3
+    # is CPU bound and runs in processes
+    from concurrent.futures import ProcessPoolExecutor  # Deferred, it imports multiprocessing
+
+    with ProcessPoolExecutor() as render_executor:
+        producer = TtsProducerPool(voice_id, None, concurrency=concurrency, cache=cache, rate_limiter=rate_limiter,
+                                   priority=RateLimiter.PRIORITY_BULK, transport=transport, backend=backend,
+                                   is_valid_voice=is_valid_voice)
+        try:
+            for input_path, output_path in output_paths.items():
+                if is_output_up_to_date(input_path, output_path):
+                    print_colored(f"Skipping '{input_path}', '{output_path}' is up to date", "yellow")
+                    continue
+                content = get_file_content(input_path)
+                if not content:
+                    continue
+
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                writer = BatchFileWriter(input_path, output_path, output_format, render_executor)
+                writers.append(writer)
+                producer.add_stream(input_path, writer)
+                producer.put(content, stream=input_path)
+                total_chars += len(content)
+        finally:
+            producer.wait_for_completion()
+
+    elapsed = time.monotonic() - start
+    rendered = sum(1 for writer in writers if writer.written)
+    failed = sum(1 for writer in writers if writer.missing_chunks)
+    print_colored(f"Rendered {rendered} of {len(writers)} files ({len(inputs) - len(writers)} up to date, {failed} failed) in {elapsed:.1f} s, "
+                  f"{total_chars / elapsed if elapsed else 0:.0f} characters per second", "cyan")
+    producer.display_request_stats()
+    producer.transport.display_stats()
+
 def get_file_content(file_path: str) -> str | None:
     """
     Read and return the content of a file.
@@ -649,12 +3662,175 @@ def process_file_oneshot(file_path: str, consumer: any) -> None:
     if content:
         consumer.put(content)
 
-def monitor_file_for_input(file_path: str, consumer: any) -> None:
+class IncrementalFileReader:
+    """
+    Reads the sentences added to or changed in a file since it was last read.
+
+    The byte offset up to which complete sentences were processed is kept together with a hash
+    of the bytes just before it. When the file changes and that tail is unchanged, only the
+    bytes after the offset are read, so appending to a large file costs as much as the appended
+    text. Otherwise (the file was truncated or edited before the offset) the file is read as a
+    whole and its sentences are diffed against hashes of the sentences seen before, and only
+    inserted or replaced sentences are returned. An unfinished last sentence is returned once a
+    sentence end or line break follows it. An edit further back than TAIL_BYTES before the offset
+    that keeps the byte length of the text before the offset is not noticed.
+    """
+    TAIL_BYTES = 4096
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.offset = 0
+        self.tail_hash = self.hash_bytes(b"")
+        self.sentence_hashes = []  # hash() of every processed sentence, in file order; only compared within this run
+        self.voice_id = None  # voice of the last [voice-XXX] switch before the offset
+        self.full_reads = 0
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> bytes:
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def split_sentences(self, data: bytes):
+        """Split bytes into complete sentences. Returns (sentences, number of bytes they span)"""
+        # surrogateescape round-trips invalid or incomplete UTF-8, so byte counts stay exact
+        segmenter = SentenceSegmenter()
+        sentences = segmenter.feed(data.decode("utf-8", errors="surrogateescape"), complete=True)
+        return sentences, len(data) - len(segmenter.pending.encode("utf-8", errors="surrogateescape"))
+
+    def skip_existing(self) -> int:
+        """Treat the sentences currently in the file as processed. Returns their number"""
+        self.read_all()
+        return len(self.sentence_hashes)
+
+    def read_changes(self) -> list:
+        """Return the texts to speak for the changes since the last read, one per run of new sentences"""
+        try:
+            with open(self.file_path, "rb") as fh:
+                size = os.fstat(fh.fileno()).st_size
+                tail_start = max(0, self.offset - self.TAIL_BYTES)
+                if size >= self.offset:
+                    fh.seek(tail_start)
+                    if self.hash_bytes(fh.read(self.offset - tail_start)) == self.tail_hash:
+                        return self.read_appended(fh)
+        except OSError as e:
+            print_colored(f"Failed to read file {self.file_path}: {e}", "red")
+            return []
+        return self.read_all()
+
+    def read_appended(self, fh) -> list:
+        """Read the sentences completed after the offset, with fh positioned at the offset"""
+        data = fh.read()
+        sentences, consumed = self.split_sentences(data)
+        if not consumed:
+            return []
+        text = "".join(sentences)
+        voice_id = self.voice_id
+        self.sentence_hashes.extend(hash(sentence.strip()) for sentence in sentences)
+        self.voice_id = last_voice_switch(text, voice_id)
+        self.offset += consumed
+        tail_start = max(0, self.offset - self.TAIL_BYTES)
+        fh.seek(tail_start)
+        self.tail_hash = self.hash_bytes(fh.read(self.offset - tail_start))
+        return [with_voice_switch(text, voice_id)] if text.strip() else []
+
+    def read_all(self) -> list:
+        """Read the whole file and return the runs of sentences that differ from the last read"""
+        import difflib
+
+        try:
+            with open(self.file_path, "rb") as fh:
+                data = fh.read()
+        except OSError as e:
+            print_colored(f"Failed to read file {self.file_path}: {e}", "red")
+            return []
+        self.full_reads += 1
+        sentences, consumed = self.split_sentences(data)
+        hashes = [hash(sentence.strip()) for sentence in sentences]
+        text = "".join(sentences)
+
+        changes = []
+        matcher = difflib.SequenceMatcher(None, self.sentence_hashes, hashes, autojunk=False)
+        opcodes = [opcode for opcode in matcher.get_opcodes() if opcode[0] in ("replace", "insert")]
+        if opcodes:
+            starts = [0, *itertools.accumulate(len(sentence) for sentence in sentences)]
+            for _, _, _, first, last in opcodes:
+                changed = text[starts[first]:starts[last]]
+                if changed.strip():
+                    changes.append(with_voice_switch(changed, last_voice_switch(text, None, starts[first])))
+
+        self.sentence_hashes = hashes
+        self.voice_id = last_voice_switch(text, None)
+        self.offset = consumed
+        self.tail_hash = self.hash_bytes(data[max(0, consumed - self.TAIL_BYTES):consumed])
+        return changes
+
+class Debouncer:
+    """
+    Coalesces bursts of triggers into one call.
+
+    The callback runs on a worker thread once no trigger arrived for `window` seconds, or at the
+    latest `max_delay` seconds after the first trigger of a burst, so a steady stream of triggers
+    still gets processed. Triggers arriving while the callback runs start the next burst.
+    """
+    MAX_DELAY_FACTOR = 4
+
+    def __init__(self, window: float, callback, max_delay: float | None = None):
+        self.window = window
+        self.callback = callback
+        self.max_delay = max_delay if max_delay is not None else window * self.MAX_DELAY_FACTOR
+        self.condition = threading.Condition()
+        self.first_trigger = None  # time.monotonic() of the first trigger of the pending burst
+        self.last_trigger = None
+        self.stopped = False
+        self.triggers = 0
+        self.calls = 0
+        self.worker = threading.Thread(target=self.run, name="debouncer")
+        self.worker.daemon = True  # Allows thread to exit when the main program does
+        self.worker.start()
+
+    def trigger(self) -> None:
+        with self.condition:
+            now = time.monotonic()
+            if self.first_trigger is None:
+                self.first_trigger = now
+            self.last_trigger = now
+            self.triggers += 1
+            self.condition.notify()
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.first_trigger is None and not self.stopped:
+                    self.condition.wait()
+                if self.first_trigger is None:
+                    return
+                while not self.stopped:
+                    due = min(self.last_trigger + self.window, self.first_trigger + self.max_delay)
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                self.first_trigger = None
+                self.calls += 1
+            try:
+                self.callback()
+            except Exception as e:
+                print_colored(f"Exception while processing file change: {e}", "red")
+
+    def stop(self) -> None:
+        """Run the callback for a pending burst right away, then stop the worker"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.worker.join()
+
+def monitor_file_for_input(file_path: str, consumer: any, incremental: bool = False, debounce: float = DEFAULT_DEBOUNCE_MS / 1000) -> None:
     """
     Monitor a file for changes and process its content when modified.
     Args:
         file_path: Path to the file to monitor.
         consumer: Consumer to process the file content.
+        incremental: Only process sentences that were added or changed, instead of the whole content.
+        debounce: Seconds without change events after which a burst of events is processed with one read.
     """
 
     from watchdog.observers import Observer
@@ -663,18 +3839,38 @@ def monitor_file_for_input(file_path: str, consumer: any) -> None:
 
     class FileChangeHandler(FileSystemEventHandler):
         old_content: str = ""
+        enqueued: int = 0
+        dropped: int = 0
 
         def on_modified(self, event):
             if event.src_path == file_path:
-                content = get_file_content(file_path)
-                if content and content != self.old_content:
-                    print_colored(f"Processing change in '{file_path}'", "yellow")
-                    self.old_content = content
-                    consumer.put(content)
+                debouncer.trigger()
+
+        def process_change(self):
+            if reader is not None:
+                for text in reader.read_changes():
+                    print_colored(f"Processing {len(text)} new characters in '{file_path}'", "yellow")
+                    self.enqueued += 1
+                    consumer.put(text)
+                return
+            content = get_file_content(file_path)
+            if content and content != self.old_content:
+                print_colored(f"Processing change in '{file_path}'", "yellow")
+                self.old_content = content
+                # The whole content is spoken again, so earlier versions that haven't started yet are obsolete
+                if hasattr(consumer, "drop_pending"):
+                    self.dropped += consumer.drop_pending()
+                self.enqueued += 1
+                consumer.put(content)
 
     observer = Observer()
     event_handler = FileChangeHandler()
+    debouncer = Debouncer(debounce, event_handler.process_change)
     file_path = os.path.abspath(file_path)
+    reader = None
+    if incremental:
+        reader = IncrementalFileReader(file_path)
+        print_colored(f"Skipping {reader.skip_existing()} sentences already in '{file_path}'", "yellow")
     dir_path = os.path.dirname(file_path)
     observer.schedule(event_handler, path=dir_path, recursive=False)
 
@@ -689,6 +3885,106 @@ def monitor_file_for_input(file_path: str, consumer: any) -> None:
         print_colored("Waiting for file monitor to finish. Press Ctrl + C to abort.", "yellow")
         observer.stop()
         observer.join()
+        debouncer.stop()
+        print_colored(f"File monitor: {debouncer.triggers} change events, {debouncer.calls} reads, "
+                      f"{event_handler.enqueued} texts enqueued, {event_handler.dropped} superseded texts dropped", "cyan")
+
+def follow_input(source: str, consumer: any, poll_interval: float = FOLLOW_POLL_INTERVAL) -> None:
+    """
+    Follow a stream of text and speak each sentence as soon as it is complete.
+    Args:
+        source: Path of a growing file or named pipe, or "-" for stdin.
+        consumer: Consumer to process the sentences.
+        poll_interval: Seconds to wait before checking a regular file for more data, and for more
+            data before a sentence ending at the end of what was read is spoken.
+
+    Bytes are read as they arrive and decoded incrementally, so a multi-byte character split
+    across reads is kept until it is complete. Pipes and stdin are read until they are closed
+    (a named pipe is reopened for the next writer); regular files are read from their current
+    end and polled for appended data like `tail -F`, starting over if the file is truncated or
+    replaced. Punctuation at the end of the data read is only taken as a sentence end once no
+    more data follows within `poll_interval` (on Windows, where pipes can't be polled, a pipe
+    holds it until the next read). Each sentence is submitted with the time its last bytes were
+    written, so the time to first sound reported by the player covers the whole way from the
+    writer to the speaker.
+    """
+    import codecs
+    import select
+    import stat
+
+    def open_source():
+        if source == "-":
+            return sys.stdin.buffer.fileno(), False
+        fd = os.open(source, os.O_RDONLY)
+        is_file = stat.S_ISREG(os.fstat(fd).st_mode)
+        if is_file:
+            os.lseek(fd, 0, os.SEEK_END)
+        return fd, is_file
+
+    def wait_for_data(fd) -> bool:
+        """Whether a pipe has data to read within poll_interval"""
+        if os.name == "nt":
+            return True  # select() only supports sockets on Windows, block in os.read() instead
+        readable, _, _ = select.select([fd], [], [], poll_interval)
+        return bool(readable)
+
+    def submit(sentences, written_at: float) -> None:
+        nonlocal voice_id
+        text = "".join(sentences)
+        if not text.strip():
+            return
+        consumer.put(with_voice_switch(text, voice_id), submitted_at=written_at)
+        voice_id = last_voice_switch(text, voice_id)
+
+    segmenter = SentenceSegmenter()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    voice_id = None  # voice of the last [voice-XXX] switch read so far
+    name = "stdin" if source == "-" else f"'{source}'"
+    try:
+        print_colored(f"Following {name}. Press Ctrl + C to stop", "green")
+        fd, is_file = open_source()
+        written_at = time.monotonic()
+        while True:
+            if segmenter.held_back and not is_file and not wait_for_data(fd):
+                submit(segmenter.feed("", complete=True), written_at)  # Nothing continued the sentence end
+                continue
+            data = os.read(fd, STREAM_READ_SIZE)
+            if data:
+                written_at = time.monotonic()
+                if is_file:
+                    # The data may have been written while we were waiting to poll again
+                    written_at -= min(poll_interval, max(0.0, time.time() - os.fstat(fd).st_mtime))
+                submit(segmenter.feed(decoder.decode(data)), written_at)
+                continue
+
+            if is_file:
+                if segmenter.held_back:
+                    submit(segmenter.feed("", complete=True), written_at)
+                position = os.lseek(fd, 0, os.SEEK_CUR)
+                try:
+                    current = os.stat(source)
+                except OSError:
+                    current = None  # being replaced, keep reading the old file until the new one appears
+                if current is not None and (current.st_ino != os.fstat(fd).st_ino or current.st_size < position):
+                    print_colored(f"{name} was truncated or replaced, reading it from the start", "yellow")
+                    os.close(fd)
+                    fd = os.open(source, os.O_RDONLY)
+                    continue
+                time.sleep(poll_interval)
+                continue
+
+            # End of a pipe: speak what is left; a named pipe gets reopened for the next writer
+            submit([decoder.decode(b"", final=True) + segmenter.flush()], time.monotonic())
+            decoder.reset()
+            if source == "-":
+                print_colored("End of input stream.", "yellow")
+                return
+            os.close(fd)
+            fd, is_file = open_source()
+    except KeyboardInterrupt:
+        print_colored("Following ended by user.", "yellow")
+    except OSError as e:
+        print_colored(f"Failed to read {name}: {e}", "red")
 
 # Main function
 def main():
@@ -701,11 +3997,11 @@ def main():
         current_path = os.environ.get("PATH", "")
         os.environ["PATH"] = f"{new_path}{os.pathsep}{current_path}"
 
-    display_header()
-
     settings = Settings()
     settings.load()
-    settings.display_settings()
+    if settings.display_stats:
+        display_header()
+        settings.display_settings()
 
     if settings.ffmpeg_bin_path:
         prepend_to_path(settings.ffmpeg_bin_path)
@@ -728,23 +4024,107 @@ def main():
         else:
             print_colored(f"Error: Invalid voice ID '{voice_id}' provided. Exiting.", "red")
             return
+    elif settings.batch:
+        print_colored("Error: A voice ID is required to render a batch. Exiting.", "red")
+        return
     else:
-        voice_id, _ = select_voice_interactive(voiceManager.voices)
+        voice_id, _ = select_voice_interactive(voiceManager)
         if not voice_id:
             print_colored("Voice selection cancelled. Exiting.", "yellow")
             return
 
-    audioPlayer = AudioPlayer()
-    ttsProducer = TtsProducer(voice_id, audioPlayer)
+    backend = SpeechmaBackend()
+    if settings.server:
+        backend = StubBackend(settings.server)
+        if settings.cache_enabled:
+            print_colored("The audio cache is not used with another server, so its audio doesn't mix with Speechma's.", "yellow")
+            settings.cache_enabled = False
+
+    audioCache = None
+    if settings.cache_enabled:
+        audioCache = AudioCache(settings.cache_dir, settings.cache_size_mb * 1024 * 1024)
+
+    decodedAudioCache = None
+    if settings.decode_cache_size_mb:
+        decodedAudioCache = DecodedAudioCache(settings.decode_cache_size_mb * 1024 * 1024)
+
+    rateLimiter = None
+    if settings.rate_limit:
+        rateLimiter = RateLimiter(settings.rate_limit, burst=settings.concurrency, state_path=settings.rate_limit_file)
+    elif settings.rate_limit_file:
+        print_colored("A rate limit file only applies with a rate limit, requests are not limited.", "yellow")
+
+    def create_transport() -> HttpTransport:
+        """Connections for the threaded engine, opened while the audio device is set up"""
+        if settings.http2:
+            print_colored("HTTP/2 is only supported by the async engine, using HTTP/1.1.", "yellow")
+        transport = HttpTransport(connection_pool_size(settings.pool_size, settings.concurrency), settings.connect_timeout, settings.read_timeout)
+        transport.prewarm(backend.url, settings.concurrency, backend.headers)
+        return transport
+
+    transport = None
+    if settings.batch or settings.engine != EngineOption.ASYNC:
+        transport = create_transport()
+
+    if settings.batch:
+        if settings.streaming:
+            print_colored("Streaming only applies to playback, batch files are rendered from downloaded audio.", "yellow")
+        try:
+            render_batch(settings.batch, settings.output_dir, settings.output_format, voice_id, settings.concurrency, audioCache,
+                         rate_limiter=rateLimiter, transport=transport, backend=backend, is_valid_voice=voiceManager.is_valid_voice)
+        finally:
+            if rateLimiter is not None:
+                rateLimiter.display_stats()
+            if audioCache is not None:
+                audioCache.display_stats()
+        return
+
+    audioPlayer = None
+    if settings.output:
+        if not settings.output.lower().endswith(".mp3"):
+            print_colored(f"'{settings.output}' is written in mp3 format.", "yellow")
+        if settings.streaming:
+            print_colored("Streaming only applies to playback, audio is written to the file once downloaded.", "yellow")
+            settings.streaming = False
+        audioConsumer = Mp3FileWriter(settings.output)
+    else:
+        audioPlayer = AudioPlayer(decode_cache=decodedAudioCache, prewarm_device=True)
+        audioConsumer = audioPlayer
+    ttsProducer = None
+    if settings.engine == EngineOption.ASYNC:
+        if settings.streaming:
+            print_colored("Streaming is not supported by the async engine, audio is played once downloaded.", "yellow")
+        try:
+            ttsProducer = AsyncTtsProducer(voice_id, audioConsumer, concurrency=settings.concurrency, cache=audioCache,
+                                           adaptive_chunking=settings.chunking == ChunkingOption.ADAPTIVE,
+                                           prefetch_seconds=settings.prefetch_seconds, rate_limiter=rateLimiter,
+                                           pool_size=settings.pool_size, connect_timeout=settings.connect_timeout,
+                                           read_timeout=settings.read_timeout, http2=settings.http2, backend=backend,
+                                           is_valid_voice=voiceManager.is_valid_voice)
+            ttsProducer.prewarm()
+        except ImportError:
+            print_colored("The async engine requires httpx (pip install httpx). Using the threaded engine.", "red")
+            transport = create_transport()
+    if ttsProducer is None:
+        ttsProducer = TtsProducer(voice_id, audioConsumer, concurrency=settings.concurrency, cache=audioCache, streaming=settings.streaming,
+                                  adaptive_chunking=settings.chunking == ChunkingOption.ADAPTIVE,
+                                  prefetch_seconds=settings.prefetch_seconds, rate_limiter=rateLimiter, transport=transport,
+                                  backend=backend, is_valid_voice=voiceManager.is_valid_voice)
 
     try:
         if settings.text:
             ttsProducer.put(settings.text)
             return
         
+        if settings.follow:
+            follow_input(settings.file or "-", ttsProducer)
+            return
+
         if settings.file:
             if settings.file_monitor == FileMonitorOption.UPDATES:
-                monitor_file_for_input(settings.file, ttsProducer)
+                monitor_file_for_input(settings.file, ttsProducer, debounce=settings.debounce_ms / 1000)
+            elif settings.file_monitor == FileMonitorOption.INCREMENTAL:
+                monitor_file_for_input(settings.file, ttsProducer, incremental=True, debounce=settings.debounce_ms / 1000)
             else:
                 process_file_oneshot(settings.file, ttsProducer)
             return
@@ -753,20 +4133,42 @@ def main():
         print("\nInteractive input mode:")
         print("  1. Type sentences to speak out loud.")
         print("  2. Each line is processed separately.")
-        print("  3. An empty line exits the program.")
+        print("  3. Start a line with '!' to stop speaking and say it right away.")
+        print("  4. An empty line exits the program.")
         print_colored("\nWaiting for user input...", "green")
         while True:
             text = input()
             if not text:
                 print_colored("End of text stream. Exiting gracefully.", "yellow")
                 return
+            if text.startswith("!"):
+                ttsProducer.flush()
+                text = text[1:].strip()
+                if not text:
+                    continue
             ttsProducer.put(text)
     finally:
         print_colored("Waiting for producers to finish. Press Ctrl + C to abort.", "yellow")
         ttsProducer.wait_for_completion()
+        if audioPlayer is not None:
+            audioPlayer.display_stats()
+        ttsProducer.display_request_stats()
+        ttsProducer.transport.display_stats()
+        if ttsProducer.prefetch is not None:
+            ttsProducer.prefetch.display_stats()
+        if rateLimiter is not None:
+            rateLimiter.display_stats()
+        if audioCache is not None:
+            audioCache.display_stats()
+        if decodedAudioCache is not None:
+            decodedAudioCache.display_stats()
 
 # Main execution
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        # Batch rendering uses worker processes, also in the pyinstaller build
+        import multiprocessing
+        multiprocessing.freeze_support()
     try:
         main()
     except KeyboardInterrupt: